@@ -1,11 +1,43 @@
+import os
+import sys
+import tempfile
+
 import streamlit as st
+import numpy as np
 import pandas as pd
-import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk_predict
+import crop_recommender
+import label_lookup
+import similar_fields
+from shared import inference_client, stage_metrics
+from shared.prediction_cache import PredictionCache, normalize_key
+from shared.stage_metrics import timed
+from shared.upload_reader import SchemaError
+
+# Models are loaded on the first prediction and then kept for the process (or
+# served by the inference server when AGRIMEN_INFERENCE_URL is set), so the
+# page renders without waiting for sklearn and the pickles.
+
+
+def recommend_top_k(df, k):
+    """Ranked class ids and probabilities (n_rows x k), scored locally or by the inference server."""
+    if inference_client.remote_enabled() and len(df):
+        ranked = inference_client.predict_batch("recommend", df[crop_recommender.FEATURES], top_k=k)
+        labels = [crop for row in ranked for crop, _ in row]
+        codes = pd.Categorical(labels, categories=crop_recommender.load_label_encoder().classes_).codes
+        proba = np.array([[p for _, p in row] for row in ranked])
+        return codes.reshape(proba.shape), proba
+    return crop_recommender.predict_top_k(df, k)
 
 
-model = joblib.load("models/crop_model.pkl")
-scaler = joblib.load("models/scaler.pkl")
-le = joblib.load("models/label_encoder.pkl")
+@st.cache_resource
+def manual_cache():
+    """Process-wide LRU of manual-input results, shared by every session."""
+    return PredictionCache(maxsize=4096, watch_paths=crop_recommender.artifact_paths(),
+                           on_invalidate=crop_recommender.reset)
 
 
 
@@ -64,13 +96,13 @@ crop_translations = {
 
 
 translations = {
-    "en": {"title":"🌾 AGRIMEN - Smart Crop Recommendation System","welcome":"Welcome to AGRIMEN! This tool predicts the best crop based on soil and climate conditions.","manual_input":"📝 Manual Input Prediction","predict_btn":"🌱 Predict Crop","bulk_prediction":"📂 Bulk Prediction (CSV/Excel Upload)","required_cols":"👉 Upload a file with columns: N, P, K, temperature, humidity, ph, rainfall","results":"📊 Predicted Crop Timetable","download":"📥 Download as CSV","sowing":"Sowing","harvest":"Harvest","duration":"Duration"},
-    "hi": {"title":"🌾 AGRIMEN - स्मार्ट फसल सिफारिश प्रणाली","welcome":"AGRIMEN में आपका स्वागत है! यह उपकरण मिट्टी और जलवायु के आधार पर सर्वोत्तम फसल की भविष्यवाणी करता है।","manual_input":"📝 मैन्युअल इनपुट भविष्यवाणी","predict_btn":"🌱 फसल भविष्यवाणी करें","bulk_prediction":"📂 बल्क भविष्यवाणी (CSV/Excel अपलोड)","required_cols":"👉 इन कॉलम वाली फ़ाइल अपलोड करें: N, P, K, temperature, humidity, ph, rainfall","results":"📊 भविष्यवाणी की गई फसल समय सारणी","download":"📥 CSV के रूप में डाउनलोड करें","sowing":"बुआई","harvest":"कटाई","duration":"अवधि"},
-    "or": {"title":"🌾 AGRIMEN - ସ୍ମାର୍ଟ ଫସଲ ସୁପାରିଶ ପ୍ରଣାଳୀ","welcome":"AGRIMEN କୁ ସ୍ୱାଗତ! ଏହି ଉପକରଣ ମାଟି ଏବଂ ଜଳବାୟୁ ଉପରେ ଆଧାର କରି ଭଲ ଫସଲ ପୂର୍ବାନୁମାନ କରେ।","manual_input":"📝 ମାନୁଆଲ୍ ଇନପୁଟ ପୂର୍ବାନୁମାନ","predict_btn":"🌱 ଫସଲ ପୂର୍ବାନୁମାନ କରନ୍ତୁ","bulk_prediction":"📂 ବଲ୍କ ପୂର୍ବାନୁମାନ (CSV/Excel ଅପଲୋଡ୍)","required_cols":"👉 ଏହି କଲମଗୁଡିକ ସହିତ ଫାଇଲ୍ ଅପଲୋଡ୍ କରନ୍ତୁ: N, P, K, temperature, humidity, ph, rainfall","results":"📊 ପୂର୍ବାନୁମାନ ହୋଇଥିବା ଫସଲ ଟାଇମଟେବଲ୍","download":"📥 CSV ଭାବରେ ଡାଉନଲୋଡ୍ କରନ୍ତୁ","sowing":"ବିଆର ମସିବା","harvest":"କାଟନି","duration":"ମିୟାଦ"},
-    "te": {"title":"🌾 AGRIMEN - స్మార్ట్ పంట సిఫారసు వ్యవస్థ","welcome":"AGRIMEN కి స్వాగతం! ఈ సాధనం నేల మరియు వాతావరణ పరిస్థితుల ఆధారంగా ఉత్తమ పంటను అంచనా వేస్తుంది.","manual_input":"📝 మాన్యువల్ ఇన్‌పుట్ అంచనా","predict_btn":"🌱 పంటను అంచనా వేయండి","bulk_prediction":"📂 బల్క్ అంచనా (CSV/Excel అప్‌లోడ్)","required_cols":"👉 ఈ కాలమ్‌లతో ఫైల్‌ని అప్‌లోడ్ చేయండి: N, P, K, temperature, humidity, ph, rainfall","results":"📊 అంచనా వేసిన పంట షెడ్యూల్","download":"📥 CSV గా డౌన్‌లోడ్ చేయండి","sowing":"విత్తనం","harvest":"కత్తెర","duration":"వ్యవధి"},
-    "ta": {"title":"🌾 AGRIMEN - ஸ்மார்ட் பயிர் பரிந்துரை அமைப்பு","welcome":"AGRIMEN-க்கு வரவேற்கிறோம்! இந்த கருவி மண் மற்றும் காலநிலையின் அடிப்படையில் சிறந்த பயிரை கணிக்கிறது.","manual_input":"📝 கையேடு உள்ளீட்டு கணிப்பு","predict_btn":"🌱 பயிரை கணிக்கவும்","bulk_prediction":"📂 மொத்த கணிப்பு (CSV/Excel பதிவேற்றம்)","required_cols":"👉 இந்த நெடுவரிசைகளுடன் கோப்பைப் பதிவேற்றவும்: N, P, K, temperature, humidity, ph, rainfall","results":"📊 கணிக்கப்பட்ட பயிர் அட்டவணை","download":"📥 CSV ஆக பதிவிறக்கவும்","sowing":"விதைப்பது","harvest":"பழுப்பு","duration":"காலம்"},
-    "ml": {"title":"🌾 AGRIMEN - സ്മാർട്ട് വിള നിർദ്ദേശ സംവിധാനം","welcome":"AGRIMEN-ലേക്ക് സ്വാഗതം! ഈ ഉപകരണം മണ്ണിന്റെയും കാലാവസ്ഥയുടെയും അടിസ്ഥാനത്തിൽ മികച്ച വിള പ്രവചിക്കുന്നു.","manual_input":"📝 മാനുവൽ ഇൻപുട്ട് പ്രവചനം","predict_btn":"🌱 വിള പ്രവചിക്കുക","bulk_prediction":"📂 ബൾക്ക് പ്രവചനം (CSV/Excel അപ്ലോഡ്)","required_cols":"👉 ഈ കോളങ്ങളോടുകൂടിയ ഫയൽ അപ്ലോഡ് ചെയ്യുക: N, P, K, temperature, humidity, ph, rainfall","results":"📊 പ്രവചിച്ച വിള ഷെഡ്യൂൾ","download":"📥 CSV ആയി ഡൗൺലോഡ് ചെയ്യുക","sowing":"തൈവ്","harvest":"പൊക്കം","duration":"കാലാവധി"},
-    "bn": {"title":"🌾 AGRIMEN - স্মার্ট ফসল সুপারিশ ব্যবস্থা","welcome":"AGRIMEN-এ স্বাগতম! এই টুল মাটি ও জলবায়ুর উপর ভিত্তি করে সেরা ফসল পূর্বাভাস দেয়।","manual_input":"📝 ম্যানুয়াল ইনপুট পূর্বাভাস","predict_btn":"🌱 ফসল পূর্বাভাস করুন","bulk_prediction":"📂 বাল্ক পূর্বাভাস (CSV/Excel আপলোড)","required_cols":"👉 নিম্নলিখিত কলাম সহ ফাইল আপলোড করুন: N, P, K, temperature, humidity, ph, rainfall","results":"📊 পূর্বাভাসিত ফসল সময়সূচি","download":"📥 CSV হিসাবে ডাউনলোড করুন","sowing":"বপন","harvest":"কাটা","duration":"সময়কাল"}
+    "en": {"title":"🌾 AGRIMEN - Smart Crop Recommendation System","welcome":"Welcome to AGRIMEN! This tool predicts the best crop based on soil and climate conditions.","manual_input":"📝 Manual Input Prediction","predict_btn":"🌱 Predict Crop","bulk_prediction":"📂 Bulk Prediction (CSV/Excel Upload)","required_cols":"👉 Upload a file with columns: N, P, K, temperature, humidity, ph, rainfall","max_rows":"Up to {n} rows per file.","results":"📊 Predicted Crop Timetable","download":"📥 Download as CSV","sowing":"Sowing","harvest":"Harvest","duration":"Duration"},
+    "hi": {"title":"🌾 AGRIMEN - स्मार्ट फसल सिफारिश प्रणाली","welcome":"AGRIMEN में आपका स्वागत है! यह उपकरण मिट्टी और जलवायु के आधार पर सर्वोत्तम फसल की भविष्यवाणी करता है।","manual_input":"📝 मैन्युअल इनपुट भविष्यवाणी","predict_btn":"🌱 फसल भविष्यवाणी करें","bulk_prediction":"📂 बल्क भविष्यवाणी (CSV/Excel अपलोड)","required_cols":"👉 इन कॉलम वाली फ़ाइल अपलोड करें: N, P, K, temperature, humidity, ph, rainfall","max_rows":"प्रति फ़ाइल अधिकतम {n} पंक्तियाँ।","results":"📊 भविष्यवाणी की गई फसल समय सारणी","download":"📥 CSV के रूप में डाउनलोड करें","sowing":"बुआई","harvest":"कटाई","duration":"अवधि"},
+    "or": {"title":"🌾 AGRIMEN - ସ୍ମାର୍ଟ ଫସଲ ସୁପାରିଶ ପ୍ରଣାଳୀ","welcome":"AGRIMEN କୁ ସ୍ୱାଗତ! ଏହି ଉପକରଣ ମାଟି ଏବଂ ଜଳବାୟୁ ଉପରେ ଆଧାର କରି ଭଲ ଫସଲ ପୂର୍ବାନୁମାନ କରେ।","manual_input":"📝 ମାନୁଆଲ୍ ଇନପୁଟ ପୂର୍ବାନୁମାନ","predict_btn":"🌱 ଫସଲ ପୂର୍ବାନୁମାନ କରନ୍ତୁ","bulk_prediction":"📂 ବଲ୍କ ପୂର୍ବାନୁମାନ (CSV/Excel ଅପଲୋଡ୍)","required_cols":"👉 ଏହି କଲମଗୁଡିକ ସହିତ ଫାଇଲ୍ ଅପଲୋଡ୍ କରନ୍ତୁ: N, P, K, temperature, humidity, ph, rainfall","max_rows":"ପ୍ରତି ଫାଇଲରେ ସର୍ବାଧିକ {n} ଧାଡି।","results":"📊 ପୂର୍ବାନୁମାନ ହୋଇଥିବା ଫସଲ ଟାଇମଟେବଲ୍","download":"📥 CSV ଭାବରେ ଡାଉନଲୋଡ୍ କରନ୍ତୁ","sowing":"ବିଆର ମସିବା","harvest":"କାଟନି","duration":"ମିୟାଦ"},
+    "te": {"title":"🌾 AGRIMEN - స్మార్ట్ పంట సిఫారసు వ్యవస్థ","welcome":"AGRIMEN కి స్వాగతం! ఈ సాధనం నేల మరియు వాతావరణ పరిస్థితుల ఆధారంగా ఉత్తమ పంటను అంచనా వేస్తుంది.","manual_input":"📝 మాన్యువల్ ఇన్‌పుట్ అంచనా","predict_btn":"🌱 పంటను అంచనా వేయండి","bulk_prediction":"📂 బల్క్ అంచనా (CSV/Excel అప్‌లోడ్)","required_cols":"👉 ఈ కాలమ్‌లతో ఫైల్‌ని అప్‌లోడ్ చేయండి: N, P, K, temperature, humidity, ph, rainfall","max_rows":"ఒక్కో ఫైల్‌కు గరిష్టంగా {n} వరుసలు.","results":"📊 అంచనా వేసిన పంట షెడ్యూల్","download":"📥 CSV గా డౌన్‌లోడ్ చేయండి","sowing":"విత్తనం","harvest":"కత్తెర","duration":"వ్యవధి"},
+    "ta": {"title":"🌾 AGRIMEN - ஸ்மார்ட் பயிர் பரிந்துரை அமைப்பு","welcome":"AGRIMEN-க்கு வரவேற்கிறோம்! இந்த கருவி மண் மற்றும் காலநிலையின் அடிப்படையில் சிறந்த பயிரை கணிக்கிறது.","manual_input":"📝 கையேடு உள்ளீட்டு கணிப்பு","predict_btn":"🌱 பயிரை கணிக்கவும்","bulk_prediction":"📂 மொத்த கணிப்பு (CSV/Excel பதிவேற்றம்)","required_cols":"👉 இந்த நெடுவரிசைகளுடன் கோப்பைப் பதிவேற்றவும்: N, P, K, temperature, humidity, ph, rainfall","max_rows":"ஒரு கோப்பிற்கு அதிகபட்சம் {n} வரிசைகள்.","results":"📊 கணிக்கப்பட்ட பயிர் அட்டவணை","download":"📥 CSV ஆக பதிவிறக்கவும்","sowing":"விதைப்பது","harvest":"பழுப்பு","duration":"காலம்"},
+    "ml": {"title":"🌾 AGRIMEN - സ്മാർട്ട് വിള നിർദ്ദേശ സംവിധാനം","welcome":"AGRIMEN-ലേക്ക് സ്വാഗതം! ഈ ഉപകരണം മണ്ണിന്റെയും കാലാവസ്ഥയുടെയും അടിസ്ഥാനത്തിൽ മികച്ച വിള പ്രവചിക്കുന്നു.","manual_input":"📝 മാനുവൽ ഇൻപുട്ട് പ്രവചനം","predict_btn":"🌱 വിള പ്രവചിക്കുക","bulk_prediction":"📂 ബൾക്ക് പ്രവചനം (CSV/Excel അപ്ലോഡ്)","required_cols":"👉 ഈ കോളങ്ങളോടുകൂടിയ ഫയൽ അപ്ലോഡ് ചെയ്യുക: N, P, K, temperature, humidity, ph, rainfall","max_rows":"ഒരു ഫയലിൽ പരമാവധി {n} വരികൾ.","results":"📊 പ്രവചിച്ച വിള ഷെഡ്യൂൾ","download":"📥 CSV ആയി ഡൗൺലോഡ് ചെയ്യുക","sowing":"തൈവ്","harvest":"പൊക്കം","duration":"കാലാവധി"},
+    "bn": {"title":"🌾 AGRIMEN - স্মার্ট ফসল সুপারিশ ব্যবস্থা","welcome":"AGRIMEN-এ স্বাগতম! এই টুল মাটি ও জলবায়ুর উপর ভিত্তি করে সেরা ফসল পূর্বাভাস দেয়।","manual_input":"📝 ম্যানুয়াল ইনপুট পূর্বাভাস","predict_btn":"🌱 ফসল পূর্বাভাস করুন","bulk_prediction":"📂 বাল্ক পূর্বাভাস (CSV/Excel আপলোড)","required_cols":"👉 নিম্নলিখিত কলাম সহ ফাইল আপলোড করুন: N, P, K, temperature, humidity, ph, rainfall","max_rows":"প্রতি ফাইলে সর্বোচ্চ {n}টি সারি।","results":"📊 পূর্বাভাসিত ফসল সময়সূচি","download":"📥 CSV হিসাবে ডাউনলোড করুন","sowing":"বপন","harvest":"কাটা","duration":"সময়কাল"}
 }
 
 
@@ -82,6 +114,8 @@ st.set_page_config(page_title="AGRIMEN", page_icon="🌾", layout="wide")
 lang_options = {"en":"English","hi":"Hindi","or":"Odia","te":"Telugu","ta":"Tamil","ml":"Malayalam","bn":"Bengali"}
 lang = st.sidebar.selectbox("🌐 Choose Language", options=list(lang_options.keys()), format_func=lambda x: lang_options[x])
 T = translations[lang]
+top_k = st.sidebar.slider("🏆 Top-k crops", 1, 5, 1)
+show_similar = st.sidebar.checkbox("🗺️ Show similar historical fields", value=False)
 
 st.title(T["title"])
 st.write(T["welcome"])
@@ -101,35 +135,121 @@ with col3:
     rainfall = st.number_input("Rainfall (mm)", 0.0, 500.0, 100.0)
 
 if st.button(T["predict_btn"]):
-    data = scaler.transform([[N, P, K, temperature, humidity, ph, rainfall]])
-    pred = model.predict(data)
-    crop_en = le.inverse_transform(pred)[0]
+    values = normalize_key([N, P, K, temperature, humidity, ph, rainfall])
+    data = pd.DataFrame([values], columns=crop_recommender.FEATURES)
+    codes, proba = manual_cache().get_or_compute(values + (top_k,), lambda: recommend_top_k(data, top_k))
+    ranked = crop_recommender.load_label_encoder().classes_[codes[0]]
+    crop_en = ranked[0]
     crop_local = crop_translations.get(crop_en.lower(), {}).get(lang, crop_en)
-    st.success(f"✅ {T['results']}: {crop_local}")
+    st.success(f"✅ {T['results']}: {crop_local} ({proba[0, 0]:.0%})")
 
     if crop_en.lower() in crop_info:
         info = crop_info[crop_en.lower()]
         st.info(f"📅 **{T['sowing']}:** {info['sowing']} | 🌾 **{T['harvest']}:** {info['harvest']} | ⏳ **{T['duration']}:** {info['duration']}")
 
+    if top_k > 1:
+        st.table(pd.DataFrame({
+            "Crop": [crop_translations.get(c.lower(), {}).get(lang, c) for c in ranked],
+            "Confidence": [f"{p:.1%}" for p in proba[0]],
+        }, index=range(1, len(ranked) + 1)))
+
+    if show_similar:
+        with st.expander("🗺️ Similar historical fields"):
+            st.dataframe(similar_fields.similar_fields(data, k=5))
+
+    stats = manual_cache().stats()
+    st.sidebar.caption(f"⚡ Cache: {stats['hits']} hits / {stats['misses']} misses ({stats['size']} entries)")
 
 
 st.subheader(T["bulk_prediction"])
 st.write(T["required_cols"])
+st.caption(T["max_rows"].format(n=f"{bulk_predict.MAX_ROWS:,}"))
 file = st.file_uploader("Upload CSV or Excel", type=["csv","xlsx"])
 
-if file:
-    if file.name.endswith(".csv"):
-        df = pd.read_csv(file)
+@st.cache_resource
+def crop_label_tables(lang):
+    """Per-class output columns for ``lang``, computed once per language and process."""
+    T = translations[lang]
+    classes = crop_recommender.load_label_encoder().classes_
+    info = lambda c, key: crop_info.get(c.lower(), {}).get(key)
+    names = label_lookup.build_table(classes, lambda c: crop_translations.get(c.lower(), {}).get(lang, c))
+    schedule = {
+        T["sowing"]: label_lookup.build_table(classes, lambda c: info(c, "sowing")),
+        T["harvest"]: label_lookup.build_table(classes, lambda c: info(c, "harvest")),
+        T["duration"]: label_lookup.build_table(classes, lambda c: info(c, "duration")),
+    }
+    return names, schedule
+
+
+def predict_chunk(df):
+    # Rows with a blank or non-numeric input are written unscored, with the reason in "Error"
+    errors = crop_recommender.input_errors(df)
+    valid = errors == ""
+    if valid.all():
+        result = score_chunk(df)
     else:
-        df = pd.read_excel(file)
+        result = score_chunk(df[valid].copy()).reindex(df.index)
+        result[list(df.columns)] = df
+    result["Error"] = errors
+    return result
+
+
+def score_chunk(df):
+    codes, proba = recommend_top_k(df, top_k)
+    # Translated names and the sowing/harvest schedule
+    with timed(crop_recommender.METRICS_NAME, "format", rows=len(df)):
+        names, schedule = crop_label_tables(lang)
+        df["Predicted Crop"] = label_lookup.take(names, codes[:, 0])
+        df["Confidence"] = proba[:, 0]
+        for rank in range(2, codes.shape[1] + 1):
+            df[f"Predicted Crop {rank}"] = label_lookup.take(names, codes[:, rank - 1])
+            df[f"Confidence {rank}"] = proba[:, rank - 1]
+        for column, table in schedule.items():
+            df[column] = label_lookup.take(table, codes[:, 0])
+    if show_similar:
+        with timed(crop_recommender.METRICS_NAME, "similar_fields", rows=len(df)):
+            for column, values in similar_fields.similar_crops(df, k=3).items():
+                df[column] = values
+    return df
 
-    input_data = scaler.transform(df[["N","P","K","temperature","humidity","ph","rainfall"]])
-    preds = model.predict(input_data)
-    df["Predicted Crop"] = le.inverse_transform(preds)
-    df["Predicted Crop"] = df["Predicted Crop"].apply(lambda x: crop_translations.get(x.lower(), {}).get(lang,x))
 
-    st.write(T["results"])
-    st.dataframe(df)
+if file:
+    # The upload is scored in fixed-size chunks straight to a CSV on disk. Results are
+    # kept per (upload and options) so the rerun caused by the download button is free.
+    bulk_key = (file.file_id, lang, top_k, show_similar)
+    if st.session_state.get("bulk_key") != bulk_key:
+        progress = st.progress(0.0)
+        # The CSV is written chunk by chunk, read back once for the download button (which keeps
+        # it in memory; uploads are capped at MAX_ROWS) and its directory is then removed
+        with tempfile.TemporaryDirectory(prefix="agrimen_") as out_dir:
+            out_path = os.path.join(out_dir, "predicted_crops.csv")
+            try:
+                # Model columns are parsed as floats; a missing one fails before any row is scored
+                preview, n_rows = bulk_predict.run_bulk(file, file.name, predict_chunk, out_path,
+                                                        crop_recommender.FEATURES, crop_recommender.UPLOAD_DTYPES,
+                                                        on_progress=progress.progress)
+                with open(out_path, "rb") as out:
+                    st.session_state.bulk_csv = out.read()
+                st.session_state.bulk_error = None
+            except (SchemaError, bulk_predict.TooManyRows) as e:
+                preview, n_rows = pd.DataFrame(), 0
+                st.session_state.bulk_csv = b""
+                st.session_state.bulk_error = str(e)
+        progress.empty()
+        st.session_state.bulk_key = bulk_key
+        st.session_state.bulk_preview = preview
+        st.session_state.bulk_rows = n_rows
+
+    if st.session_state.bulk_error:
+        st.error(f"❌ {st.session_state.bulk_error}")
+    else:
+        st.write(T["results"])
+        st.dataframe(st.session_state.bulk_preview)
+        if st.session_state.bulk_rows > len(st.session_state.bulk_preview):
+            st.caption(f"{len(st.session_state.bulk_preview)} / {st.session_state.bulk_rows}")
+
+        st.download_button(label=T["download"], data=st.session_state.bulk_csv, file_name="predicted_crops.csv",
+                           mime="text/csv")
 
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(label=T["download"], data=csv, file_name="predicted_crops.csv", mime="text/csv")
+# Admin-only stage timings (set AGRIMEN_ADMIN)
+stage_metrics.admin_panel()
@@ -0,0 +1,94 @@
+"""
+Chunked bulk prediction for uploaded CSV/Excel files.
+
+Uploads are read, scored and written out in fixed-size batches so peak memory
+depends on the chunk size rather than the file size. The model's columns are
+parsed with declared dtypes and any others kept as text (shared.upload_reader);
+a non-numeric cell becomes NaN rather than failing the upload. Results are
+appended to a CSV file on disk; only a small preview is kept in memory. Reading and
+writing each chunk are timed as the "parse" and "write" stages (shared.stage_metrics).
+
+The finished file is offered through st.download_button, which holds the whole
+download in memory, so uploads are capped at MAX_ROWS rows.
+"""
+import time
+
+import pandas as pd
+
+from shared.stage_metrics import record, timed
+from shared.upload_reader import iter_upload
+
+CHUNK_ROWS = 50_000
+PREVIEW_ROWS = 1_000
+# Largest upload scored; its results (~200 bytes a row, 40 MB at the cap) are served from memory
+MAX_ROWS = 200_000
+
+
+class TooManyRows(ValueError):
+    """The upload has more rows than ``run_bulk`` was allowed to score."""
+
+
+def count_rows(file, name):
+    """Counts data rows without loading the file (used to drive the progress bar)."""
+    if name.endswith(".csv"):
+        file.seek(0)
+        lines = sum(block.count(b"\n") for block in iter(lambda: file.read(1 << 20), b""))
+        file.seek(0)
+        return max(lines - 1, 0)
+    from openpyxl import load_workbook
+    wb = load_workbook(file, read_only=True, data_only=True)
+    total = max((wb.active.max_row or 1) - 1, 0)
+    wb.close()
+    file.seek(0)
+    return total
+
+
+def iter_chunks(file, name, columns, dtypes=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yields DataFrames of at most ``chunk_rows`` rows from a CSV or .xlsx
+    upload, with ``columns`` in their declared ``dtypes`` (cells that are not
+    numbers become NaN) and other columns as text. Raises SchemaError before
+    the first chunk when a column is missing.
+    """
+    yield from iter_upload(file, name, columns, dtypes, chunk_rows=chunk_rows, invalid="coerce")
+
+
+def _timed_chunks(chunks, metrics_name):
+    """Passes ``chunks`` through, recording the time taken to parse each one."""
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        record(metrics_name, "parse", time.perf_counter() - start, len(chunk))
+        yield chunk
+
+
+def run_bulk(file, name, predict_chunk, out_path, columns, dtypes=None, on_progress=None,
+             chunk_rows=CHUNK_ROWS, preview_rows=PREVIEW_ROWS, metrics_name="recommend", max_rows=MAX_ROWS):
+    """
+    Scores an upload chunk by chunk and appends the results to ``out_path`` as CSV.
+
+    Chunks hold the upload's ``columns`` and any extra ones (see ``iter_chunks``);
+    ``predict_chunk(df)`` returns the chunk with its prediction columns added.
+    ``on_progress(fraction)`` is called after every chunk. Returns
+    (preview DataFrame, number of rows written). Raises TooManyRows before
+    scoring when the upload has more than ``max_rows`` rows (None: no limit).
+    """
+    total = count_rows(file, name)
+    if max_rows is not None and total > max_rows:
+        raise TooManyRows(f"{name} has {total:,} rows; at most {max_rows:,} can be scored per upload.")
+    preview = []
+    done = 0
+    with open(out_path, "w", encoding="utf-8", newline="") as out:
+        for chunk in _timed_chunks(iter_chunks(file, name, columns, dtypes, chunk_rows), metrics_name):
+            result = predict_chunk(chunk)
+            with timed(metrics_name, "write", rows=len(result)):
+                result.to_csv(out, index=False, header=done == 0)
+            if done < preview_rows:
+                preview.append(result.head(preview_rows - done))
+            done += len(result)
+            if on_progress is not None:
+                on_progress(min(done / total, 1.0) if total else 1.0)
+    preview_df = pd.concat(preview, ignore_index=True) if preview else pd.DataFrame()
+    return preview_df, done
@@ -0,0 +1,142 @@
+"""
+Crop recommendation model: artifact loading and prediction.
+
+Shared by the Streamlit app (app.py) and the inference server so both use the
+same preprocessing. Artifacts are loaded once per process and reused.
+
+When models/crop_forest.npz (written by forest_compiler.py) is present and
+was compiled from the current crop_model.pkl and scaler.pkl (by SHA-256, so
+copies and checkouts that change mtimes do not matter), small batches are scored by the compiled forest on
+raw features; larger batches go through sklearn.
+
+Unlike the yield models, the recommender is not fused into one
+shared.pipeline_artifact file. incremental_train.py warm-starts and archives
+crop_model.pkl on its own (with its own version log) while the scaler and
+label encoder stay fixed, and forest_compiler.py folds the scaler into the
+compiled forest, so the separate files are what those tools update.
+"""
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from forest_compiler import COMPILED_NAME, CompiledForest, source_hashes
+from shared.stage_metrics import timed
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+# Column types of Crop_recommendation.xlsx, used when caching it as Parquet
+TRAINING_DTYPES = {"N": "int64", "P": "int64", "K": "int64", "temperature": "float64",
+                   "humidity": "float64", "ph": "float64", "rainfall": "float64", "label": "category"}
+# Column types of a bulk upload (shared.upload_reader); floats so blank cells read as NaN
+UPLOAD_DTYPES = dict.fromkeys(FEATURES, "float64")
+# Below this many rows the compiled forest beats sklearn's per-call overhead
+COMPILED_MAX_ROWS = 256
+ARTIFACT_FILES = ["crop_model.pkl", "scaler.pkl", "label_encoder.pkl", COMPILED_NAME]
+METRICS_NAME = "recommend"
+
+log = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def load_label_encoder(models_dir=MODELS_DIR):
+    """Returns the fitted label encoder; its ``classes_`` define the class ids."""
+    import joblib
+
+    return joblib.load(os.path.join(models_dir, "label_encoder.pkl"))
+
+
+@lru_cache(maxsize=1)
+def load_artifacts(models_dir=MODELS_DIR):
+    """Returns (model, scaler, label_encoder) loaded from ``models_dir``."""
+    import joblib
+
+    model = joblib.load(os.path.join(models_dir, "crop_model.pkl"))
+    scaler = joblib.load(os.path.join(models_dir, "scaler.pkl"))
+    return model, scaler, load_label_encoder(models_dir)
+
+
+@lru_cache(maxsize=1)
+def load_compiled(models_dir=MODELS_DIR):
+    """
+    Returns the compiled forest, or None when it is missing or was not
+    compiled from the current crop_model.pkl and scaler.pkl (logged once).
+    """
+    compiled_path = os.path.join(models_dir, COMPILED_NAME)
+    if not os.path.exists(compiled_path):
+        return None
+    forest = CompiledForest.load(compiled_path)
+    try:
+        current = source_hashes(models_dir)
+    except OSError:
+        current = None
+    if forest.source_sha256 != current:
+        log.warning("%s does not match crop_model.pkl/scaler.pkl; scoring with sklearn. "
+                    "Run forest_compiler.py to rebuild it.", compiled_path)
+        return None
+    return forest
+
+
+def artifact_paths(models_dir=MODELS_DIR):
+    return [os.path.join(models_dir, name) for name in ARTIFACT_FILES]
+
+
+def reset():
+    """Forgets loaded artifacts so the next prediction reloads them from disk."""
+    load_label_encoder.cache_clear()
+    load_artifacts.cache_clear()
+    load_compiled.cache_clear()
+
+
+def predict_proba(df):
+    """Returns (class ids, probability matrix) for every row of ``df``."""
+    compiled = load_compiled()
+    if compiled is not None and len(df) <= COMPILED_MAX_ROWS:
+        # The scaler is folded into the compiled thresholds, so this is the whole model
+        with timed(METRICS_NAME, "predict_compiled", rows=len(df)):
+            return compiled.classes_, compiled.predict_proba(df[FEATURES].to_numpy(dtype=np.float64))
+    model, scaler, _ = load_artifacts()
+    if len(df) == 0:
+        return model.classes_, np.empty((0, len(model.classes_)))
+    with timed(METRICS_NAME, "scale", rows=len(df)):
+        X = scaler.transform(df[FEATURES])
+    with timed(METRICS_NAME, "predict", rows=len(df)):
+        return model.classes_, model.predict_proba(X)
+
+
+def input_errors(df):
+    """Per-row messages for blank or non-numeric FEATURES ('' for rows that can be scored)."""
+    errors = np.full(len(df), "", dtype=object)
+    for col in FEATURES:
+        bad = df[col].isna().to_numpy()
+        if bad.any():
+            message = f"missing or non-numeric {col}"
+            errors[bad] = np.where(errors[bad] == "", message, errors[bad] + "; " + message)
+    return errors
+
+
+def predict_codes(df):
+    """Predicts the encoded class id for every row of ``df`` (needs FEATURES columns)."""
+    classes, proba = predict_proba(df)
+    return classes[np.argmax(proba, axis=1)]
+
+
+def recommend(df):
+    """Predicts the English crop label for every row of ``df``."""
+    return load_label_encoder().classes_[predict_codes(df)]
+
+
+def predict_top_k(df, k=3):
+    """
+    Ranks the ``k`` most likely crops for every row from one ``predict_proba`` call.
+
+    Returns (class ids, probabilities), both shaped (n_rows, k) and ordered best first.
+    """
+    classes, proba = predict_proba(df)
+    k = max(1, min(k, proba.shape[1]))
+    top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+    top_proba = np.take_along_axis(proba, top, axis=1)
+    order = np.argsort(-top_proba, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    return classes[top], np.take_along_axis(top_proba, order, axis=1)
@@ -0,0 +1,165 @@
+"""
+Compiles the crop RandomForest into flat NumPy arrays for fast inference.
+
+Every tree's nodes are concatenated into contiguous feature / threshold /
+child / value arrays, and the saved StandardScaler is folded into the split
+thresholds, so raw N, P, K, temperature, humidity, ph and rainfall values go
+straight in. The SHA-256 of the crop_model.pkl and scaler.pkl it was built
+from is stored with the arrays, so a stale file can be recognised. Prediction walks all trees for a whole batch at once, one
+vectorised step per tree level, instead of dispatching tree by tree through
+sklearn. This removes sklearn's per-call overhead, which dominates small
+batches; very large batches are still as fast or faster through sklearn's
+Cython loop (see crop_recommender.COMPILED_MAX_ROWS).
+
+Usage (from the AgriMen folder, after train_model.py):
+    python forest_compiler.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+COMPILED_NAME = "crop_forest.npz"
+# The files folded into the compiled forest, in the order of its "source_sha256" array
+SOURCE_FILES = ["crop_model.pkl", "scaler.pkl"]
+BLOCK_ROWS = 1024
+
+
+def source_hashes(models_dir=MODELS_DIR):
+    """SHA-256 of each of SOURCE_FILES in ``models_dir``."""
+    from shared.pipeline_artifact import file_sha256
+
+    return [file_sha256(os.path.join(models_dir, name)) for name in SOURCE_FILES]
+
+
+def fold_thresholds(threshold, mean, scale):
+    """
+    Maps sklearn split thresholds onto the raw feature space.
+
+    sklearn casts the scaled input to float32 and goes left when
+    float32((x - mean) / scale) <= t. That holds exactly when the scaled value
+    is below the midpoint between the largest float32 <= t and the next
+    float32 up, so the folded test is ``x < midpoint * scale + mean`` and the
+    compiled forest makes the same decisions as the original.
+    """
+    t32 = threshold.astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    upper = np.nextafter(t32, np.float32(np.inf))
+    midpoint = (t32.astype(np.float64) + upper.astype(np.float64)) / 2
+    return midpoint * scale + mean
+
+
+def compile_forest(model, scaler):
+    """Returns a dict of flat arrays describing ``model`` on the unscaled feature space."""
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(offset, offset + n)
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = fold_thresholds(tree.threshold, scaler.mean_[feature], scaler.scale_[feature])
+        # Leaves loop onto themselves so every row can take the same number of steps.
+        threshold = np.where(is_leaf, np.inf, threshold)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset)
+        left = np.where(is_leaf, node_ids, tree.children_left + offset)
+
+        value = tree.value[:, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        # children[2 * node + went_left]
+        children.append(np.stack([right, left], axis=1).ravel())
+        values.append(value)
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += n
+
+    return {
+        "feature": np.concatenate(features).astype(np.intp),
+        "threshold": np.concatenate(thresholds),
+        "children": np.concatenate(children).astype(np.intp),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.intp),
+        "classes": np.asarray(model.classes_),
+        "max_depth": np.int64(depth),
+    }
+
+
+class CompiledForest:
+    """Batch traversal engine over the arrays produced by :func:`compile_forest`."""
+
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.max_depth = int(arrays["max_depth"])
+        # Absent in files compiled before the hashes were stored
+        self.source_sha256 = [str(h) for h in arrays["source_sha256"]] if "source_sha256" in arrays else None
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def _leaves(self, X):
+        """Leaf node ids, shaped (n_rows, n_trees), for a C-contiguous float64 block."""
+        flat = X.ravel()
+        row_base = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.roots.size)).copy()
+        for _ in range(self.max_depth):
+            went_left = flat[row_base + self.feature[node]] < self.threshold[node]
+            node = self.children[2 * node + went_left]
+        return node
+
+    def predict_proba(self, X):
+        """Mean per-tree class probabilities, matching RandomForestClassifier.predict_proba."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        proba = np.zeros((X.shape[0], self.value.shape[1]))
+        for start in range(0, X.shape[0], BLOCK_ROWS):
+            leaves = self._leaves(X[start:start + BLOCK_ROWS])
+            out = proba[start:start + len(leaves)]
+            for tree in range(leaves.shape[1]):
+                out += self.value[leaves[:, tree]]
+        return proba / self.roots.size
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def export(models_dir=MODELS_DIR, check_data=None):
+    """
+    Compiles models/crop_model.pkl + scaler.pkl into models/crop_forest.npz.
+
+    When ``check_data`` (raw feature rows) is given, the compiled engine is
+    compared against the sklearn model and the agreement rate is returned.
+    """
+    import joblib
+
+    model = joblib.load(os.path.join(models_dir, "crop_model.pkl"))
+    scaler = joblib.load(os.path.join(models_dir, "scaler.pkl"))
+    arrays = compile_forest(model, scaler)
+    arrays["source_sha256"] = np.array(source_hashes(models_dir))
+    np.savez(os.path.join(models_dir, COMPILED_NAME), **arrays)
+
+    if check_data is None:
+        return None
+    expected = model.predict(scaler.transform(check_data))
+    return float(np.mean(CompiledForest(arrays).predict(np.asarray(check_data)) == expected))
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "Crop_recommendation.xlsx"
+    df = pd.read_excel(source) if source.endswith(".xlsx") else pd.read_csv(source)
+    agreement = export(check_data=df.drop("label", axis=1))
+    print(f"Compiled forest saved to 'models/{COMPILED_NAME}' (agreement with sklearn: {agreement:.4%})")
@@ -0,0 +1,156 @@
+"""
+Incremental refresh of the crop recommender from newly labelled samples.
+
+Instead of refitting 300 trees, the saved forest is warm-started: a small
+number of extra trees is grown on the new rows plus a stratified replay sample
+of the original training data (so every crop class is still represented), and
+the scaler and label encoder are kept fixed. The previous model is archived
+under models/versions/ and accuracy drift against it is reported.
+
+Usage (from the AgriMen folder):
+    python incremental_train.py new_samples.csv [--new-trees 50] [--replay 0.2] [--max-trees 600]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_compiler import COMPILED_NAME, export
+from crop_recommender import TRAINING_DTYPES
+from shared.dataset_cache import load_dataset
+
+MODELS_DIR = "models"
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+VERSION_LOG = os.path.join(MODELS_DIR, "model_versions.json")
+BASE_DATASET = "Crop_recommendation.xlsx"
+# Below this many new rows none are held out: all are trained on and only the base test set is scored
+MIN_HOLDOUT_ROWS = 10
+
+
+def read_table(path):
+    return pd.read_excel(path) if path.endswith(".xlsx") else pd.read_csv(path)
+
+
+def read_base_dataset():
+    return load_dataset(BASE_DATASET, TRAINING_DTYPES)
+
+
+def load_versions():
+    if os.path.exists(VERSION_LOG):
+        with open(VERSION_LOG, encoding="utf-8") as f:
+            return json.load(f)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add trees to the crop model from new labelled rows")
+    parser.add_argument("new_samples", help="CSV/Excel file with the training columns and 'label'")
+    parser.add_argument("--new-trees", type=int, default=50, help="trees to add (default 50)")
+    parser.add_argument("--replay", type=float, default=0.2,
+                        help="fraction of the original training rows mixed into the new trees (default 0.2)")
+    parser.add_argument("--max-trees", type=int, default=600,
+                        help="drop the oldest trees beyond this many (default 600)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rf = joblib.load(os.path.join(MODELS_DIR, "crop_model.pkl"))
+    scaler = joblib.load(os.path.join(MODELS_DIR, "scaler.pkl"))
+    le = joblib.load(os.path.join(MODELS_DIR, "label_encoder.pkl"))
+    features = list(scaler.feature_names_in_)
+
+    new = read_table(args.new_samples)
+    if new.empty:
+        sys.exit(f"Error: {args.new_samples} has no rows.")
+    missing = [c for c in features + ["label"] if c not in new.columns]
+    if missing:
+        sys.exit(f"Error: new samples are missing columns: {', '.join(missing)}")
+    unknown = sorted(set(new["label"]) - set(le.classes_))
+    if unknown:
+        sys.exit(f"Error: unseen crop labels {unknown}; run train_model.py for a full rebuild.")
+
+    # Same split as train_model.py, so the base test set is never trained on
+    base = read_base_dataset()
+    Xb_train, Xb_test, yb_train, yb_test = train_test_split(
+        scaler.transform(base[features]), le.transform(base["label"]),
+        test_size=0.2, random_state=42, stratify=le.transform(base["label"])
+    )
+    X_new = scaler.transform(new[features])
+    y_new = le.transform(new["label"])
+    if len(y_new) >= MIN_HOLDOUT_ROWS:
+        # Stratified only when every crop can appear on both sides of the split
+        counts = np.bincount(y_new)
+        classes = counts[counts > 0]
+        stratify = y_new if classes.min() >= 2 and math.ceil(0.2 * len(y_new)) >= len(classes) else None
+        Xn_train, Xn_test, yn_train, yn_test = train_test_split(
+            X_new, y_new, test_size=0.2, random_state=42, stratify=stratify
+        )
+    else:
+        print(f"Only {len(y_new)} new rows (< {MIN_HOLDOUT_ROWS}): training on all of them, none held out.")
+        Xn_train, yn_train, Xn_test, yn_test = X_new, y_new, None, None
+
+    versions = load_versions()
+    version = (versions[-1]["version"] if versions else 1) + 1
+
+    # A fresh replay sample per version, so successive refreshes see different old rows
+    _, X_replay, _, y_replay = train_test_split(
+        Xb_train, yb_train, test_size=args.replay, random_state=version, stratify=yb_train
+    )
+    X_fit = np.vstack([Xn_train, X_replay])
+    y_fit = np.concatenate([yn_train, y_replay])
+
+    prev_base_acc = accuracy_score(yb_test, rf.predict(Xb_test))
+    prev_new_acc = accuracy_score(yn_test, rf.predict(Xn_test)) if Xn_test is not None else None
+    prev_trees = len(rf.estimators_)
+
+    rf.set_params(warm_start=True, n_estimators=prev_trees + args.new_trees)
+    rf.fit(X_fit, y_fit)
+    if len(rf.estimators_) > args.max_trees:
+        rf.estimators_ = rf.estimators_[-args.max_trees:]
+        rf.n_estimators = args.max_trees
+    rf.set_params(warm_start=False)
+
+    base_acc = accuracy_score(yb_test, rf.predict(Xb_test))
+    new_acc = accuracy_score(yn_test, rf.predict(Xn_test)) if Xn_test is not None else None
+
+    # Archive the previous model before replacing it
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    os.replace(os.path.join(MODELS_DIR, "crop_model.pkl"),
+               os.path.join(VERSIONS_DIR, f"crop_model_v{version - 1}.pkl"))
+    joblib.dump(rf, os.path.join(MODELS_DIR, "crop_model.pkl"))
+    export()
+
+    entry = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "new_rows": int(len(new)),
+        "trees": len(rf.estimators_),
+        "accuracy_base_test": base_acc,
+        "accuracy_new_rows": new_acc,
+        "drift_base_test": base_acc - prev_base_acc,
+        "drift_new_rows": new_acc - prev_new_acc if new_acc is not None else None,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    versions.append(entry)
+    with open(VERSION_LOG, "w", encoding="utf-8") as f:
+        json.dump(versions, f, indent=2)
+
+    print(f"Trees: {prev_trees} -> {len(rf.estimators_)} (+{args.new_trees} on {len(y_fit)} rows)")
+    print(f"Accuracy on base test set: {prev_base_acc:.4f} -> {base_acc:.4f} ({base_acc - prev_base_acc:+.4f})")
+    if new_acc is not None:
+        print(f"Accuracy on held-out new rows: {prev_new_acc:.4f} -> {new_acc:.4f} ({new_acc - prev_new_acc:+.4f})")
+    print(f"\n Model v{version} saved to 'models/crop_model.pkl' (+ '{COMPILED_NAME}'); "
+          f"v{version - 1} archived in '{VERSIONS_DIR}/' ({entry['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
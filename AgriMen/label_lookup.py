@@ -0,0 +1,29 @@
+"""
+Class-id indexed lookup tables for post-processing predictions.
+
+Every per-crop output (translated name, sowing/harvest/duration) is computed
+once per class. A batch of encoded predictions then becomes a single array take
+and comes back as a pandas Categorical, so the cost is one lookup per class
+rather than one string operation per row.
+"""
+import numpy as np
+import pandas as pd
+
+
+def build_table(classes, value_for):
+    """
+    Builds a lookup table for ``classes`` (the label encoder's ``classes_``).
+
+    ``value_for(class_name)`` returns the output for that class, or None when
+    there is none. Returns (class id -> category index array, categories).
+    """
+    values = [value_for(c) for c in classes]
+    categories = pd.Index(pd.unique(pd.Series([v for v in values if v is not None], dtype=object)))
+    index = categories.get_indexer([v if v is not None else np.nan for v in values])
+    return index.astype(np.intp), categories
+
+
+def take(table, codes):
+    """Maps encoded class ids to a Categorical of table values (NaN where a class has none)."""
+    index, categories = table
+    return pd.Categorical.from_codes(index[np.asarray(codes, dtype=np.intp)], categories=categories)
@@ -0,0 +1,98 @@
+"""
+Nearest-neighbour lookup of similar historical fields in final_crop_dataset.csv.
+
+A KD-tree over the standardised N, P, K, temperature, humidity, ph and rainfall
+space (the same scaler the model uses) is built once and persisted next to the
+model, so a manual input or every row of a bulk upload can be matched against
+the ~20k recorded fields in well under a millisecond per query.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from shared.dataset_cache import load_dataset
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BASE_DIR, "final_crop_dataset.csv")
+INDEX_PATH = os.path.join(BASE_DIR, "models", "similar_fields.pkl")
+SCALER_PATH = os.path.join(BASE_DIR, "models", "scaler.pkl")
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+DTYPES = {"n": "int64", "p": "int64", "k": "int64", "temperature": "float64", "humidity": "float64",
+          "ph": "float64", "rainfall": "float64", "label": "category", "fertility_score": "int64",
+          "fertility_level": "category"}
+
+
+def build_index(dataset_path=DATASET_PATH, scaler_path=SCALER_PATH):
+    """Builds the KD-tree and the per-field records it points into."""
+    import joblib
+    from sklearn.neighbors import KDTree
+
+    scaler = joblib.load(scaler_path)
+    records = load_dataset(dataset_path, DTYPES).rename(columns={"n": "N", "p": "P", "k": "K"})
+    points = (records[FEATURES].to_numpy(dtype=np.float64) - scaler.mean_) / scaler.scale_
+    return {
+        "tree": KDTree(points, leaf_size=40),
+        "records": records,
+        "mean": scaler.mean_,
+        "scale": scaler.scale_,
+    }
+
+
+def export(index_path=INDEX_PATH, **kwargs):
+    """Builds the index and saves it to ``index_path``."""
+    import joblib
+
+    index = build_index(**kwargs)
+    joblib.dump(index, index_path)
+    return index
+
+
+@lru_cache(maxsize=1)
+def load_index(index_path=INDEX_PATH):
+    """Loads the persisted index, rebuilding it if it is missing or older than its inputs."""
+    import joblib
+
+    sources = [DATASET_PATH, SCALER_PATH]
+    if os.path.exists(index_path) and all(os.path.getmtime(index_path) >= os.path.getmtime(p) for p in sources):
+        return joblib.load(index_path)
+    try:
+        return export(index_path)
+    except OSError:
+        # Read-only deployment: keep the freshly built index in memory only
+        return build_index()
+
+
+def query(df, k=5):
+    """Returns (distances, record positions), both shaped (n_rows, k), nearest first."""
+    index = load_index()
+    if len(df) == 0:
+        # KDTree.query rejects an empty array (a bulk chunk whose rows were all invalid)
+        return np.empty((0, k)), np.empty((0, k), dtype=np.intp)
+    points = (df[FEATURES].to_numpy(dtype=np.float64) - index["mean"]) / index["scale"]
+    return index["tree"].query(points, k=k)
+
+
+def similar_fields(df, k=5):
+    """The ``k`` recorded fields closest to the single input row in ``df``."""
+    distances, positions = query(df.iloc[:1], k)
+    result = load_index()["records"].iloc[positions[0]].reset_index(drop=True)
+    result["distance"] = distances[0]
+    return result
+
+
+def similar_crops(df, k=3):
+    """
+    Columns for a bulk upload: the crop of each of the ``k`` nearest fields
+    (as Categoricals) plus the distance to the nearest one.
+    """
+    distances, positions = query(df, k)
+    labels = load_index()["records"]["label"]
+    codes = labels.cat.codes.to_numpy()
+    columns = {
+        f"Similar Field {i + 1}": pd.Categorical.from_codes(codes[positions[:, i]], categories=labels.cat.categories)
+        for i in range(positions.shape[1])
+    }
+    columns["Similar Field Distance"] = distances[:, 0]
+    return columns
@@ -5,12 +5,21 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import similar_fields
+from crop_recommender import TRAINING_DTYPES
+from forest_compiler import COMPILED_NAME, export
+from shared.dataset_cache import load_dataset
+from shared.manifest import write_manifest
 
 
 os.makedirs("models", exist_ok=True)
 
 
-df = pd.read_excel("Crop_recommendation.xlsx")
+df = load_dataset("Crop_recommendation.xlsx", TRAINING_DTYPES)
 
 
 X = df.drop("label", axis=1)
@@ -43,5 +52,14 @@ print("\nClassification Report:\n", classification_report(y_test, y_pred, target
 joblib.dump(rf, "models/crop_model.pkl")
 joblib.dump(le, "models/label_encoder.pkl")
 joblib.dump(scaler, "models/scaler.pkl")
+write_manifest("models", X.columns, vocabularies={"label": le.classes_}, numeric=X, target="label")
+
+# Flat-array copy of the forest with the scaler folded in, for low-latency serving
+agreement = export(check_data=X)
+print(f"Compiled forest saved to 'models/{COMPILED_NAME}' (agreement with sklearn: {agreement:.4%})")
+
+# Nearest-neighbour index over the historical field records, in the new scaler's space
+similar_fields.export()
+print("Similar-fields index saved to 'models/similar_fields.pkl'")
 
 print("\n Model, Label Encoder & Scaler saved inside 'models/' folder successfully!")
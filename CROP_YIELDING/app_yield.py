@@ -1,13 +1,41 @@
+import os
+import sys
+
 import streamlit as st
 import pandas as pd
-import joblib
 
-# Load trained model artifacts
-model = joblib.load("models/crop_yield_model.pkl")
-scaler = joblib.load("models/yield_scaler.pkl")
-le_crop = joblib.load("models/crop_label_encoder.pkl")
-le_season = joblib.load("models/season_label_encoder.pkl")
-le_state = joblib.load("models/state_label_encoder.pkl")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crop_yield_predictor
+from shared import inference_client, stage_metrics
+from shared.result_export import FORMATS, available_formats, export_results, file_name
+from shared.prediction_cache import PredictionCache, normalize_key
+from shared.stage_metrics import timed
+from shared.upload_reader import SchemaError, read_upload
+
+# The page only needs the training manifest (JSON) to render; the fused model
+# pipeline is loaded on the first prediction and kept for the process, or the
+# server does the scoring when AGRIMEN_INFERENCE_URL is set.
+vocabularies = crop_yield_predictor.load_model_manifest()["vocabularies"]
+
+
+def predict_yield(df):
+    if inference_client.remote_enabled():
+        return inference_client.predict_batch("yield", df[crop_yield_predictor.FEATURES])
+    return crop_yield_predictor.predict_yield(df)
+
+
+def predict_bulk(df):
+    """Returns (predictions, errors); rows with unknown categories or bad numbers are skipped, not fatal."""
+    remote = predict_yield if inference_client.remote_enabled() else None
+    return crop_yield_predictor.predict_valid_rows(df, predict=remote)
+
+
+@st.cache_resource
+def manual_cache():
+    """Process-wide LRU of manual-input results, shared by every session."""
+    return PredictionCache(maxsize=4096, watch_paths=crop_yield_predictor.artifact_paths(),
+                           on_invalidate=crop_yield_predictor.reset)
 
 # Translation dictionary with full translations
 translations = {
@@ -20,7 +48,7 @@ translations = {
         "required_cols": "👉 Required Columns: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 Predicted Yield",
         "unit": "tons per hectare",
-        "download": "📥 Download Results as CSV"
+        "download": "📥 Download Results"
     },
     "hi": {
         "title": "🌾 AGRIMEN – स्मार्ट फसल उत्पादन भविष्यवाणी",
@@ -31,7 +59,7 @@ translations = {
         "required_cols": "👉 आवश्यक कॉलम: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 अनुमानित उत्पादन",
         "unit": "टन प्रति हेक्टेयर",
-        "download": "📥 परिणाम CSV के रूप में डाउनलोड करें"
+        "download": "📥 परिणाम डाउनलोड करें"
     },
     "or": {
         "title": "🌾 AGRIMEN – ସ୍ମାର୍ଟ କ୍ରପ୍ ୟିଲ୍ଡ ପ୍ରିଡିକ୍ସନ୍",
@@ -53,7 +81,7 @@ translations = {
         "required_cols": "👉 అవసరమైన కాలమ్స్: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 అంచనా వేశారు దిగుబడి",
         "unit": "టన్నులు ప్రతి హెక్టేరు",
-        "download": "📥 ఫలితాలను CSV గా డౌన్లోడ్ చేయండి"
+        "download": "📥 ఫలితాలను డౌన్లోడ్ చేయండి"
     },
     "ta": {
         "title": "🌾 AGRIMEN – ஸ்மார்ட் பயிர் விளைவு கணிப்பு",
@@ -64,7 +92,7 @@ translations = {
         "required_cols": "👉 தேவைப்படும் பத்திகள்: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 கணிக்கப்பட்ட விளைவு",
         "unit": "டன் ஒன்றுக்கு ஹெக்டேர்",
-        "download": "📥 முடிவுகளை CSV ஆக பதிவிறக்கவும்"
+        "download": "📥 முடிவுகளை பதிவிறக்கவும்"
     },
     "ml": {
         "title": "🌾 AGRIMEN – സ്മാർട്ട് വിളവ് പ്രവചനം",
@@ -75,7 +103,7 @@ translations = {
         "required_cols": "👉 ആവശ്യമായ കോളങ്ങൾ: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 പ്രവചിച്ച വിളവ്",
         "unit": "ടൺസ് പ്രതി ഹെക്ടർ",
-        "download": "📥 ഫലങ്ങൾ CSV ആയി ഡൗൺലോഡ് ചെയ്യുക"
+        "download": "📥 ഫലങ്ങൾ ഡൗൺലോഡ് ചെയ്യുക"
     },
     "bn": {
         "title": "🌾 AGRIMEN – স্মার্ট ফসল উৎপাদন পূর্বাভাস",
@@ -86,7 +114,7 @@ translations = {
         "required_cols": "👉 প্রয়োজনীয় কলাম: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 পূর্বাভাসিত উৎপাদন",
         "unit": "টন প্রতি হেক্টর",
-        "download": "📥 ফলাফল CSV হিসাবে ডাউনলোড করুন"
+        "download": "📥 ফলাফল ডাউনলোড করুন"
     }
 }
 
@@ -109,7 +137,7 @@ lang = st.sidebar.selectbox("🌐 Select Language", options=list(lang_options.ke
 # Ensure language change triggers rerun
 if 'current_lang' not in st.session_state or st.session_state.current_lang != lang:
     st.session_state.current_lang = lang
-    st.experimental_rerun()
+    st.rerun()
 
 T = translations[lang]
 
@@ -121,11 +149,11 @@ st.subheader(T["manual_input"])
 
 col1, col2, col3 = st.columns(3)
 with col1:
-    crop = st.selectbox(T["manual_input"], options=le_crop.classes_)
+    crop = st.selectbox(T["manual_input"], options=vocabularies['Crop'])
     crop_year = st.number_input("Crop Year", 1997, 2025, 2020)
-    season = st.selectbox("Season", options=le_season.classes_)
+    season = st.selectbox("Season", options=vocabularies['Season'])
 with col2:
-    state = st.selectbox("State", options=le_state.classes_)
+    state = st.selectbox("State", options=vocabularies['State'])
     area = st.number_input("Area (in hectares)", min_value=0.1, max_value=1e7, value=1000.0, step=0.1)
     production = st.number_input("Production (in kg)", min_value=0.0, max_value=1e10, value=5000.0, step=1.0)
 with col3:
@@ -134,15 +162,15 @@ with col3:
     pesticide = st.number_input("Pesticide Used (kg)", min_value=0.0, max_value=1e7, value=1000.0, step=1.0)
 
 if st.button(T["predict_btn"]):
-    crop_enc = le_crop.transform([crop])[0]
-    season_enc = le_season.transform([season])[0]
-    state_enc = le_state.transform([state])[0]
-
-    data = [[crop_enc, crop_year, season_enc, state_enc, area, production, annual_rainfall, fertilizer, pesticide]]
-    data_scaled = scaler.transform(data)
-    yield_pred = model.predict(data_scaled)[0]
+    # Categories are matched against the training vocabulary as-is (it keeps trailing spaces)
+    key = (crop, season, state) + normalize_key([crop_year, area, production, annual_rainfall, fertilizer, pesticide])
+    data = pd.DataFrame([[crop, crop_year, season, state, area, production, annual_rainfall, fertilizer, pesticide]],
+                        columns=crop_yield_predictor.FEATURES)
+    yield_pred = manual_cache().get_or_compute(key, lambda: predict_yield(data)[0])
 
     st.success(f"✅ {T['results']}: {yield_pred:.2f} {T['unit']}")
+    stats = manual_cache().stats()
+    st.sidebar.caption(f"⚡ Cache: {stats['hits']} hits / {stats['misses']} misses ({stats['size']} entries)")
 
 st.subheader(T["bulk_prediction"])
 st.write(T["required_cols"])
@@ -150,26 +178,34 @@ st.write(T["required_cols"])
 file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"])
 
 if file:
-    if file.name.endswith('.csv'):
-        df = pd.read_csv(file)
+    # Model columns are parsed with declared types, any others kept as text; a missing column fails
+    # before the rows are read, a non-numeric cell only skips its row
+    try:
+        with timed(crop_yield_predictor.METRICS_NAME, "parse") as timer:
+            df = read_upload(file, file.name, crop_yield_predictor.FEATURES, crop_yield_predictor.UPLOAD_DTYPES,
+                             invalid="coerce")
+            timer.rows = len(df)
+    except SchemaError as e:
+        st.error(f"❌ {e}")
     else:
-        df = pd.read_excel(file)
+        predictions, errors = predict_bulk(df)
 
-    required_cols = ['Crop', 'Crop_Year', 'Season', 'State', 'Area', 'Production', 'Annual_Rainfall', 'Fertilizer', 'Pesticide']
-    if not all(col in df.columns for col in required_cols):
-        st.error("❌ Missing required columns in the uploaded file.")
-    else:
-        df['Crop'] = le_crop.transform(df['Crop'])
-        df['Season'] = le_season.transform(df['Season'])
-        df['State'] = le_state.transform(df['State'])
+        df['Predicted_Yield'] = predictions.round(2)
+        skipped = errors.ne("")
+        if skipped.any():
+            df['Error'] = errors
+            st.warning(f"⚠️ {int(skipped.sum())} of {len(df)} rows were skipped because of unknown Crop/Season/State "
+                       f"values or missing/non-numeric inputs.")
 
-        input_data = scaler.transform(df[required_cols])
-        predictions = model.predict(input_data)
-
-        df['Predicted_Yield'] = [f"{pred:.2f} {T['unit']}" for pred in predictions]
-
-        st.write(T["results"])
+        st.write(f"{T['results']} ({T['unit']})")
         st.dataframe(df)
 
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(label=T["download"], data=csv, file_name='predicted_yields.csv', mime='text/csv')
+        fmt = st.selectbox("Export format", available_formats(), format_func=lambda f: FORMATS[f]["label"])
+        # Predictions stay numeric; the unit is stored as column metadata (or in the CSV header)
+        with timed(crop_yield_predictor.METRICS_NAME, "export", rows=len(df)):
+            data = export_results(df, fmt, units={'Predicted_Yield': translations["en"]["unit"]})
+        st.download_button(label=T["download"], data=data, file_name=file_name('predicted_yields', fmt),
+                           mime=FORMATS[fmt]["mime"])
+
+# Admin-only stage timings (set AGRIMEN_ADMIN)
+stage_metrics.admin_panel()
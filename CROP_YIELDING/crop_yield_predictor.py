@@ -0,0 +1,137 @@
+"""
+Crop yield model: artifact loading and prediction.
+
+Shared by the Streamlit app (app_yield.py) and the inference server so both use
+the same encoding and scaling. Artifacts are loaded once per process and reused.
+"""
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.category_encoder import CategoryEncoder
+from shared.manifest import load_manifest
+from shared import pipeline_artifact
+from shared.stage_metrics import timed
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+FEATURES = ['Crop', 'Crop_Year', 'Season', 'State', 'Area', 'Production', 'Annual_Rainfall', 'Fertilizer', 'Pesticide']
+CAT_FEATURES = ['Crop', 'Season', 'State']
+NUM_FEATURES = [col for col in FEATURES if col not in CAT_FEATURES]
+# Column types of a bulk upload (shared.upload_reader)
+UPLOAD_DTYPES = {col: "category" if col in CAT_FEATURES else "float64" for col in FEATURES}
+PIPELINE_FILE = "crop_yield_pipeline.joblib"
+METRICS_NAME = "yield"
+
+
+def build_pipeline(model, scaler, vocabularies):
+    """
+    Fuses the trained pieces into one Pipeline: raw frame -> category codes
+    -> scaler -> native XGBoost booster.
+    """
+    from sklearn.pipeline import Pipeline
+    from shared.pipeline_steps import BoosterRegressor, CategoryCodes
+    from shared.xgb_native import NativeRegressor
+
+    return Pipeline([
+        ("encode", CategoryCodes({col: list(values) for col, values in vocabularies.items()}, FEATURES)),
+        ("scale", scaler),
+        ("model", BoosterRegressor(NativeRegressor.from_model(model))),
+    ])
+
+
+def pipeline_path(models_dir=MODELS_DIR):
+    return os.path.join(models_dir, PIPELINE_FILE)
+
+
+def load_artifacts(models_dir=MODELS_DIR):
+    """Returns (pipeline, header), loaded and hash-checked on first use."""
+    return pipeline_artifact.load_pipeline(pipeline_path(models_dir))
+
+
+def load_model_manifest(models_dir=MODELS_DIR):
+    """The training manifest: input vocabularies and ranges, and the model version."""
+    return load_manifest(models_dir)
+
+
+@lru_cache(maxsize=1)
+def load_category_encoder(models_dir=MODELS_DIR):
+    """
+    Encoder over the manifest's vocabularies (tolerant of spacing and case),
+    for validating inputs without loading the model.
+    """
+    vocabularies = load_model_manifest(models_dir)["vocabularies"]
+    return CategoryEncoder({col: vocabularies[col] for col in CAT_FEATURES})
+
+
+def artifact_paths(models_dir=MODELS_DIR):
+    path = pipeline_path(models_dir)
+    return [path, pipeline_artifact.header_path(path)]
+
+
+def reset():
+    """Forgets loaded artifacts so the next prediction reloads them from disk."""
+    load_category_encoder.cache_clear()
+    pipeline_artifact.forget(pipeline_path())
+
+
+def _encode(pipeline, df):
+    with timed(METRICS_NAME, "encode", rows=len(df)):
+        return pipeline.named_steps["encode"].encode(df)
+
+
+def _score(pipeline, data):
+    """The scaler and booster steps of ``pipeline``, timed separately."""
+    with timed(METRICS_NAME, "scale", rows=len(data)):
+        scaled = pipeline.named_steps["scale"].transform(data)
+    with timed(METRICS_NAME, "predict", rows=len(data)):
+        return pipeline.named_steps["model"].predict(scaled)
+
+
+def predict_yield(df):
+    """Predicts yield for every row of ``df`` given raw Crop/Season/State strings."""
+    pipeline, _ = load_artifacts()
+    data, errors = _encode(pipeline, df)
+    bad = errors.ne("")
+    if bad.any():
+        raise ValueError(f"{int(bad.sum())} row(s) have unknown categories, e.g. row {errors.index[bad][0]}: "
+                         f"{errors[bad].iloc[0]}")
+    return _score(pipeline, data)
+
+
+def _add_numeric_errors(df, errors):
+    """Notes every row with a missing numeric input (blank, or not a number in a coerced upload)."""
+    for col in NUM_FEATURES:
+        bad = df[col].isna().to_numpy()
+        if bad.any():
+            message = f"missing or non-numeric {col}"
+            errors[bad] = np.where(errors[bad] == "", message, errors[bad] + "; " + message)
+    return errors
+
+
+def predict_valid_rows(df, predict=None):
+    """
+    Scores only the rows whose categories are known and whose numeric inputs
+    are present.
+
+    Returns (predictions, errors): NaN predictions for rejected rows and the
+    reason for each. ``predict`` scores the clean rows (defaults to the local
+    pipeline; remote callers validate against the manifest instead).
+    """
+    predictions = np.full(len(df), np.nan)
+    if predict is None:
+        pipeline, _ = load_artifacts()
+        data, errors = _encode(pipeline, df)
+        valid = _add_numeric_errors(df, errors).eq("").to_numpy()
+        if valid.any():
+            predictions[valid] = _score(pipeline, data[valid])
+    else:
+        with timed(METRICS_NAME, "encode", rows=len(df)):
+            errors = load_category_encoder().encode(df)[1]
+        valid = _add_numeric_errors(df, errors).eq("").to_numpy()
+        if valid.any():
+            predictions[valid] = predict(df[valid])
+    return predictions, errors
@@ -1,16 +1,37 @@
+import argparse
 import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from xgboost import XGBRegressor
-import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crop_yield_predictor import FEATURES, PIPELINE_FILE, build_pipeline
+from shared.dataset_cache import load_dataset
+from shared.manifest import write_manifest
+from shared.pipeline_artifact import save_pipeline
+from shared.xgb_search import budgeted_search
+
+DTYPES = {
+    'Crop': 'category', 'Crop_Year': 'int64', 'Season': 'category', 'State': 'category',
+    'Area': 'float64', 'Production': 'int64', 'Annual_Rainfall': 'float64',
+    'Fertilizer': 'float64', 'Pesticide': 'float64', 'Yield': 'float64'
+}
+
+parser = argparse.ArgumentParser(description="Train the crop yield XGBoost model")
+parser.add_argument("--search", choices=["grid", "budgeted"], default="grid",
+                    help="grid: GridSearchCV; budgeted: successive halving with early stopping (shared/xgb_search.py)")
+parser.add_argument("--cpus", type=int, default=None, help="total CPU threads for the search (default: all)")
+args = parser.parse_args()
 
 # Ensure models folder exists
 os.makedirs("models", exist_ok=True)
 
 # Load dataset
-df = pd.read_csv("crop_yield.csv")
+df = load_dataset("crop_yield.csv", DTYPES)
 
 # Encode categorical variables
 le_crop = LabelEncoder()
@@ -43,20 +64,29 @@ param_grid = {
     'subsample': [0.8, 1.0]
 }
 
-grid_search = GridSearchCV(
-    estimator=XGBRegressor(objective='reg:squarederror', random_state=42),
-    param_grid=param_grid,
-    scoring='r2',
-    cv=5,
-    n_jobs=-1,
-    verbose=1
-)
-
-# Fit GridSearchCV
-grid_search.fit(X_train, y_train)
-
-# Best model after tuning
-best_model = grid_search.best_estimator_
+if args.search == "budgeted":
+    best, _ = budgeted_search(X_train, y_train.to_numpy(), list(ParameterGrid(param_grid)),
+                              cpu_budget=args.cpus, base_params={'seed': 42})
+    best_params = {**best['params'], 'n_estimators': best['best_iteration']}
+    print(f"Best parameters: {best_params}")
+    best_model = XGBRegressor(objective='reg:squarederror', random_state=42, n_jobs=args.cpus, **best_params)
+    best_model.fit(X_train, y_train)
+else:
+    # One thread per XGBRegressor: GridSearchCV already runs a fit per core
+    grid_search = GridSearchCV(
+        estimator=XGBRegressor(objective='reg:squarederror', random_state=42, n_jobs=1),
+        param_grid=param_grid,
+        scoring='r2',
+        cv=5,
+        n_jobs=args.cpus or -1,
+        verbose=1
+    )
+
+    # Fit GridSearchCV
+    grid_search.fit(X_train, y_train)
+
+    # Best model after tuning
+    best_model = grid_search.best_estimator_
 
 # Evaluate
 y_pred = best_model.predict(X_test)
@@ -68,11 +98,11 @@ print(f"MAE: {mae}")
 print(f"MSE: {mse}")
 print(f"R2 Score: {r2}")
 
-# Save final models and scalers for Streamlit app
-joblib.dump(best_model, "models/crop_yield_model.pkl")
-joblib.dump(scaler, "models/yield_scaler.pkl")
-joblib.dump(le_crop, "models/crop_label_encoder.pkl")
-joblib.dump(le_season, "models/season_label_encoder.pkl")
-joblib.dump(le_state, "models/state_label_encoder.pkl")
+# Save one fused pipeline (category codes -> scaler -> native booster) for the Streamlit app
+vocabularies = {'Crop': le_crop.classes_, 'Season': le_season.classes_, 'State': le_state.classes_}
+header = save_pipeline(build_pipeline(best_model, scaler, vocabularies), f"models/{PIPELINE_FILE}",
+                       inputs=FEATURES, metrics={'mae': mae, 'mse': mse, 'r2': r2})
+write_manifest("models", X.columns, vocabularies=vocabularies,
+               numeric=X.drop(columns=['Crop', 'Season', 'State']), target='Yield')
 
-print("\n✅ Model, scaler, and label encoders saved in 'models/' folder successfully!")
+print(f"\n✅ Pipeline v{header['version']} saved to 'models/{PIPELINE_FILE}' (sha256 {header['sha256'][:12]})")
@@ -0,0 +1,214 @@
+"""
+AGRIMEN inference server.
+
+Keeps every model resident in one process and serves JSON predictions so the
+Streamlit apps (and any other service) can score inputs without a UI rerun.
+
+Endpoints
+---------
+GET  /health                      -> which models are loaded
+GET  /metrics                     -> per-stage timings in Prometheus text format
+POST /v1/<model>                  -> body: one input object, returns {"prediction": ...}
+POST /v1/<model>/batch            -> body: {"rows": [...]}, returns {"predictions": [...]}
+
+yield and odisha-yield validate every row the way the apps do: rejected rows
+score null and the batch response carries the reason in "errors" (one entry per
+row, "" when the row was scored); a rejected single row is a 400.
+
+<model> is one of: recommend, yield, odisha-yield, price.
+recommend also accepts "top_k": n, returning [[crop, probability], ...] per row.
+
+Run from the repository root:
+    python INFERENCE_SERVER/server.py --port 8500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+for folder in ["AgriMen", "CROP_YIELDING", "SIH_Crop_yielding", "UPDATED_PRICE_PREDICTION"]:
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+import crop_recommender
+import crop_yield_predictor
+import odisha_yield_predictor
+import price_predictor
+from shared import stage_metrics
+from shared.stage_metrics import timed
+
+# --- MODEL REGISTRY ---
+# name -> (module with load_artifacts(), prediction function, required input columns)
+MODELS = {
+    "recommend": (crop_recommender, crop_recommender.recommend, crop_recommender.FEATURES),
+    "yield": (crop_yield_predictor, crop_yield_predictor.predict_yield, crop_yield_predictor.FEATURES),
+    "odisha-yield": (odisha_yield_predictor, odisha_yield_predictor.predict_yield, odisha_yield_predictor.FEATURES),
+    "price": (price_predictor, price_predictor.predict_price, []),
+}
+
+# name -> single-row scorer taking the input dict, skipping DataFrame construction
+SINGLE_ROW = {
+    "price": price_predictor.predict_row,
+}
+
+# name -> predict_valid_rows(df) returning (predictions, per-row errors)
+VALIDATED = {
+    "yield": crop_yield_predictor.predict_valid_rows,
+    "odisha-yield": odisha_yield_predictor.predict_valid_rows,
+}
+
+MAX_BATCH_ROWS = int(os.environ.get("AGRIMEN_MAX_BATCH_ROWS", "100000"))
+
+
+def preload():
+    """Loads every model once at startup; models whose files are missing are reported and skipped."""
+    status = {}
+    for name, (module, _, _) in MODELS.items():
+        try:
+            module.load_artifacts()
+            status[name] = "loaded"
+        except (OSError, EOFError) as e:
+            status[name] = f"unavailable: {e}"
+        print(f"[{name}] {status[name]}")
+    return status
+
+
+def _frame(rows, required, name):
+    with timed(name, "frame", rows=len(rows)):
+        df = pd.DataFrame(rows)
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    return df
+
+
+def run_model(name, rows):
+    """
+    Scores ``rows`` (list of dicts) with model ``name``.
+
+    Returns (predictions, errors): JSON-ready predictions and, for validated
+    models, the reason each row was rejected ("" if scored, None otherwise).
+    """
+    _, predict, required = MODELS[name]
+    if len(rows) == 1 and name in SINGLE_ROW:
+        return [SINGLE_ROW[name](rows[0])], None
+    df = _frame(rows, required, name)
+    if name not in VALIDATED:
+        return pd.Series(predict(df)).tolist(), None
+    predictions, errors = VALIDATED[name](df)
+    errors = errors.tolist()
+    return [None if error else p for p, error in zip(predictions.tolist(), errors)], errors
+
+
+def run_top_k(rows, k):
+    """Ranked [[crop, probability], ...] recommendations for every row."""
+    codes, proba = crop_recommender.predict_top_k(_frame(rows, crop_recommender.FEATURES, "recommend"), int(k))
+    labels = crop_recommender.load_label_encoder().classes_[codes]
+    return [[[c, p] for c, p in zip(crops, probs)] for crops, probs in zip(labels.tolist(), proba.tolist())]
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    server_version = "AgrimenInference/1.0"
+    model_status = {}
+
+    def _send(self, code, payload):
+        self._send_body(code, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_body(self, code, body, content_type):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "models": self.model_status})
+        elif self.path == "/metrics":
+            self._send_body(200, stage_metrics.render().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) not in (2, 3) or parts[0] != "v1" or parts[1] not in MODELS \
+                or (len(parts) == 3 and parts[2] != "batch"):
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        name, batch = parts[1], len(parts) == 3
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            with timed(name, "request_parse"):
+                payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "Request body is not valid JSON"})
+            return
+
+        top_k = payload.pop("top_k", None) if isinstance(payload, dict) else None
+        if top_k is not None and name != "recommend":
+            self._send(400, {"error": "top_k is only supported by recommend"})
+            return
+
+        if batch:
+            rows = payload.get("rows") if isinstance(payload, dict) else None
+            if not isinstance(rows, list) or not rows:
+                self._send(400, {"error": "Batch body must be {\"rows\": [...]} with at least one row"})
+                return
+            if len(rows) > MAX_BATCH_ROWS:
+                self._send(413, {"error": f"Batch exceeds {MAX_BATCH_ROWS} rows"})
+                return
+        elif not isinstance(payload, dict):
+            self._send(400, {"error": "Body must be a JSON object"})
+            return
+        else:
+            rows = [payload]
+
+        start = time.perf_counter()
+        try:
+            predictions, errors = run_model(name, rows) if top_k is None else (run_top_k(rows, top_k), None)
+        except (OSError, EOFError) as e:
+            self._send(503, {"error": f"Model '{name}' is not available: {e}"})
+            return
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if not batch and errors and errors[0]:
+            self._send(400, {"error": errors[0]})
+            return
+        with timed(name, "respond", rows=len(predictions)):
+            if batch:
+                body = {"predictions": predictions, "count": len(predictions), "elapsed_ms": elapsed_ms}
+                if errors is not None:
+                    body["errors"] = errors
+                self._send(200, body)
+            else:
+                self._send(200, {"prediction": predictions[0], "elapsed_ms": elapsed_ms})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AGRIMEN inference server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8500)
+    args = parser.parse_args()
+
+    InferenceHandler.model_status = preload()
+    httpd = ThreadingHTTPServer((args.host, args.port), InferenceHandler)
+    print(f"Serving AGRIMEN models on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
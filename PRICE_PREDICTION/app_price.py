@@ -1,10 +1,44 @@
+import os
+import sys
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import joblib
 
-# Load only required artifacts
-model = joblib.load("models/price_prediction_model.pkl")
-scaler = joblib.load("models/price_scaler.pkl")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import inference_client, stage_metrics
+from shared.result_export import FORMATS, available_formats, export_results, file_name
+from shared.stage_metrics import timed
+from shared.upload_reader import read_upload
+
+# Stage timings are labelled like the inference server's price endpoint
+METRICS_NAME = "price"
+
+
+# Load only required artifacts, once per process and only when the first
+# prediction needs them (joblib, scipy and xgboost are imported here too)
+@st.cache_resource
+def load_artifacts():
+    from shared import pipeline_artifact
+    from shared.sparse_features import PIPELINE_FILE, split_pipeline
+
+    # One hash-checked file: scaler, feature order and native booster
+    pipeline, _ = pipeline_artifact.load_pipeline(os.path.join("models", PIPELINE_FILE))
+    return split_pipeline(pipeline)
+
+
+def predict_price(df):
+    # Same artifacts as UPDATED_PRICE_PREDICTION, so the server's price endpoint applies
+    if inference_client.remote_enabled():
+        return inference_client.predict_batch("price", df)
+    from shared.sparse_features import build_matrix
+
+    model, scaler, feature_columns = load_artifacts()
+    # Scaled numeric columns plus the sparse one-hot block, as in training
+    X = build_matrix(df, scaler, feature_columns, METRICS_NAME)
+    with timed(METRICS_NAME, "predict", rows=len(df)):
+        return model.predict(X)
 
 # Translation dictionary (full translations as before)
 translations = {
@@ -17,7 +51,7 @@ translations = {
         "required_cols": "👉 Required Columns: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 Predicted Price",
         "unit": "INR per quintal",
-        "download": "📥 Download Results as CSV"
+        "download": "📥 Download Results"
     },
     "hi": {
         "title": "🌾 AGRIMEN – स्मार्ट फसल मूल्य पूर्वानुमान",
@@ -28,13 +62,13 @@ translations = {
         "required_cols": "👉 आवश्यक कॉलम: Crop, Crop_Year, Season, State, Area, Production, Annual_Rainfall, Fertilizer, Pesticide",
         "results": "📊 अनुमानित मूल्य",
         "unit": "रुपये प्रति क्विंटल",
-        "download": "📥 परिणाम CSV के रूप में डाउनलोड करें"
+        "download": "📥 परिणाम डाउनलोड करें"
     },
-    "or": { /* Odia Translations */ },
-    "te": { /* Telugu Translations */ },
-    "ta": { /* Tamil Translations */ },
-    "ml": { /* Malayalam Translations */ },
-    "bn": { /* Bengali Translations */ }
+    "or": {},  # Odia translations pending; falls back to English
+    "te": {},  # Telugu translations pending; falls back to English
+    "ta": {},  # Tamil translations pending; falls back to English
+    "ml": {},  # Malayalam translations pending; falls back to English
+    "bn": {}  # Bengali translations pending; falls back to English
 }
 
 st.set_page_config(page_title="Crop Price Prediction", page_icon="🌾", layout="wide")
@@ -53,9 +87,9 @@ lang = st.sidebar.selectbox("🌐 Select Language", list(lang_options.keys()), f
 
 if 'current_lang' not in st.session_state or st.session_state.current_lang != lang:
     st.session_state.current_lang = lang
-    st.experimental_rerun()
+    st.rerun()
 
-T = translations[lang]
+T = {**translations["en"], **translations[lang]}
 
 st.title(T["title"])
 st.write(T["welcome"])
@@ -80,11 +114,14 @@ if st.button(T["predict_btn"]):
     data = [[crop, crop_year, season, state, area, production, annual_rainfall, fertilizer, pesticide]]
     data_df = pd.DataFrame(data, columns=['Crop', 'Crop_Year', 'Season', 'State', 'Area', 'Production', 'Annual_Rainfall', 'Fertilizer', 'Pesticide'])
 
-    # Apply same preprocessing logic from training (use scaler only)
-    data_scaled = scaler.transform(data_df)
-    price_pred = model.predict(data_scaled)[0]
-
-    st.success(f"✅ {T['results']}: {price_pred:.2f} {T['unit']}")
+    # Apply same preprocessing logic from training (use scaler only). The market model needs
+    # Min_Price/Max_Price/Month/DayOfWeek, so inputs without them are rejected rather than scored as 0
+    try:
+        price_pred = predict_price(data_df)[0]
+    except (ValueError, inference_client.InferenceError) as e:
+        st.error(f"❌ {e}")
+    else:
+        st.success(f"✅ {T['results']}: {price_pred:.2f} {T['unit']}")
 
 st.subheader(T["bulk_prediction"])
 st.write(T["required_cols"])
@@ -92,22 +129,28 @@ st.write(T["required_cols"])
 file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"])
 
 if file:
-    if file.name.endswith('.csv'):
-        df = pd.read_csv(file)
-    else:
-        df = pd.read_excel(file)
-
     required_cols = ['Crop', 'Crop_Year', 'Season', 'State', 'Area', 'Production', 'Annual_Rainfall', 'Fertilizer', 'Pesticide']
-    if not all(col in df.columns for col in required_cols):
-        st.error("❌ Missing required columns in the uploaded file.")
+    # Any columns beyond the required ones are kept as text; a missing one fails before the rows are read.
+    # SchemaError is a ValueError, like the market model's missing-input error
+    try:
+        with timed(METRICS_NAME, "parse") as timer:
+            df = read_upload(file, file.name, required_cols)
+            timer.rows = len(df)
+        predictions = predict_price(df)
+    except (ValueError, inference_client.InferenceError) as e:
+        st.error(f"❌ {e}")
     else:
-        input_data = scaler.transform(df[required_cols])
-        predictions = model.predict(input_data)
-
-        df['Predicted_Price'] = [f"{pred:.2f} {T['unit']}" for pred in predictions]
+        df['Predicted_Price'] = np.round(predictions, 2)
 
-        st.write(T["results"])
+        st.write(f"{T['results']} ({T['unit']})")
         st.dataframe(df)
 
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(label=T["download"], data=csv, file_name='predicted_prices.csv', mime='text/csv')
+        fmt = st.selectbox("Export format", available_formats(), format_func=lambda f: FORMATS[f]["label"])
+        # Predictions stay numeric; the unit is stored as column metadata (or in the CSV header)
+        with timed(METRICS_NAME, "export", rows=len(df)):
+            data = export_results(df, fmt, units={'Predicted_Price': translations["en"]["unit"]})
+        st.download_button(label=T["download"], data=data, file_name=file_name('predicted_prices', fmt),
+                           mime=FORMATS[fmt]["mime"])
+
+# Admin-only stage timings (set AGRIMEN_ADMIN)
+stage_metrics.admin_panel()
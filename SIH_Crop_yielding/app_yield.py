@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import odisha_yield_predictor
+from shared import inference_client, stage_metrics
+from shared.result_export import FORMATS, available_formats, export_results, file_name
+from shared.stage_metrics import timed
+from shared.upload_reader import SchemaError, read_upload
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -12,82 +19,75 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- LOAD SAVED MODELS AND PREPROCESSORS ---
-@st.cache_resource
+# --- LOAD THE SAVED MODEL PIPELINE ---
 def load_artifacts():
     """
-    Loads the trained model, one-hot encoder, and scaler.
+    Loads the fused model pipeline (feature engineering, encoding, scaling and
+    the forest) on the first prediction and keeps it for the process, checking
+    it against its header.
     """
-    model_path = 'models/crop_yield_model.pkl'
-    ohe_path = 'models/yield_ohe_encoder.pkl'
-    scaler_path = 'models/yield_scaler.pkl'
-
-    # Check if all required model files exist
-    if not all(os.path.exists(p) for p in [model_path, ohe_path, scaler_path]):
-        st.error("Error: One or more model files are missing from the 'models' directory.")
-        st.info("Please ensure you have run the `train_yield_model.py` script to generate the required model files.")
-        return None, None, None
-        
+    pipeline_path = odisha_yield_predictor.pipeline_path()
+    if not os.path.exists(pipeline_path):
+        st.error(f"Error: the model pipeline '{os.path.basename(pipeline_path)}' is missing from the 'models' directory.")
+        st.info("Please ensure you have run the `train_yield_predict.py` script to generate it.")
+        return None
+
     try:
-        model = joblib.load(model_path)
-        ohe_encoder = joblib.load(ohe_path)
-        scaler = joblib.load(scaler_path)
-        return model, ohe_encoder, scaler
+        return odisha_yield_predictor.load_artifacts()
     except Exception as e:
-        st.error(f"An unexpected error occurred while loading model files: {e}")
-        return None, None, None
+        st.error(f"An unexpected error occurred while loading the model pipeline: {e}")
+        return None
 
-model, ohe_encoder, scaler = load_artifacts()
+def artifacts_ready():
+    # With AGRIMEN_INFERENCE_URL set the inference server holds the model instead
+    return inference_client.remote_enabled() or load_artifacts() is not None
 
 # --- DATA FOR UI SELECTIONS ---
-# These lists should be derived from the unique values in your original training dataset
-CROP_TYPES = [
-    'Rice', 'Maize', 'Wheat', 'Ragi', 'Moong', 'Groundnut', 'Sugarcane',
-    'Cotton', 'Jute', 'Potato', 'Onion', 'Turmeric', 'Ginger', 'Chilli'
-]
-SEASONS = ['Kharif', 'Rabi', 'Summer']
-DISTRICTS = [
-    'Angul', 'Balangir', 'Balasore', 'Bargarh', 'Bhadrak', 'Boudh',
-    'Cuttack', 'Deogarh', 'Dhenkanal', 'Gajapati', 'Ganjam', 'Jagatsinghpur',
-    'Jajpur', 'Jharsuguda', 'Kalahandi', 'Kandhamal', 'Kendrapara',
-    'Keonjhar', 'Khordha', 'Koraput', 'Malkangiri', 'Mayurbhanj',
-    'Nabarangpur', 'Nayagarh', 'Nuapada', 'Puri', 'Rayagada', 'Sambalpur',
-    'Subarnapur', 'Sundargarh'
-]
+# Written by train_yield_predict.py from the fitted OneHotEncoder, so the
+# options always match what the model was trained on
+manifest = odisha_yield_predictor.load_model_manifest()
+CROP_TYPES = manifest['vocabularies']['Crop type']
+SEASONS = manifest['vocabularies']['Season']
+DISTRICTS = manifest['vocabularies']['District']
+RAINFALL_RANGE = manifest['numeric_ranges']['Annual rainfall (mm)']
+INPUTS_RANGE = manifest['numeric_ranges']['Pesticide and fertilizer used (kg/hectare)']
 
 # --- UI (USER INTERFACE) ---
 st.title("🌾 Odisha Crop Yield Prediction")
 st.markdown("Enter the details of the crop and environmental factors to predict the crop yield in tonnes per hectare.")
 
 st.sidebar.header("Enter Input Parameters")
+st.sidebar.caption(f"Model v{manifest['version']} · trained {manifest['trained_at'][:10]}")
 
 # --- USER INPUTS VIA SIDEBAR (CORRECTED) ---
 # TARGET LEAKAGE FIX: REMOVED inputs for 'Cultivated area (hectares)' and 'Total production (tonnes)'
-crop_type = st.sidebar.selectbox("Select Crop Type", options=sorted(CROP_TYPES))
-season = st.sidebar.selectbox("Select Season", options=sorted(SEASONS))
-district = st.sidebar.selectbox("Select District", options=sorted(DISTRICTS))
+crop_type = st.sidebar.selectbox("Select Crop Type", options=CROP_TYPES)
+season = st.sidebar.selectbox("Select Season", options=SEASONS)
+district = st.sidebar.selectbox("Select District", options=DISTRICTS)
 
 annual_rainfall = st.sidebar.number_input(
     "Annual Rainfall (mm)",
     min_value=0.0,
     max_value=5000.0,
-    value=1500.0,
+    value=round(RAINFALL_RANGE['median'], -1),
     step=50.0,
-    help="Enter the total annual rainfall in millimeters."
+    help=f"Enter the total annual rainfall in millimeters. "
+         f"Training data range: {RAINFALL_RANGE['min']:.0f}–{RAINFALL_RANGE['max']:.0f} mm."
 )
 
 pesticide_fertilizer_used = st.sidebar.number_input(
     "Pesticide & Fertilizer Used (kg/hectare)",
     min_value=0.0,
     max_value=1000.0,
-    value=100.0,
+    value=round(INPUTS_RANGE['median'], -1),
     step=10.0,
-    help="Enter the amount of pesticide and fertilizer used per hectare in kilograms."
+    help=f"Enter the amount of pesticide and fertilizer used per hectare in kilograms. "
+         f"Training data range: {INPUTS_RANGE['min']:.0f}–{INPUTS_RANGE['max']:.0f} kg/ha."
 )
 
 # --- PREDICTION LOGIC ---
 if st.sidebar.button("Predict Yield", type="primary"):
-    if model is not None and ohe_encoder is not None and scaler is not None:
+    if artifacts_ready():
         # 1. Create a DataFrame from user inputs
         input_data = pd.DataFrame({
             'Crop type': [crop_type],
@@ -97,24 +97,13 @@ if st.sidebar.button("Predict Yield", type="primary"):
             'Pesticide and fertilizer used (kg/hectare)': [pesticide_fertilizer_used]
         })
 
-        # 2. Feature Engineering (must be identical to training script)
-        input_data['Rainfall_Pesticide'] = input_data['Annual rainfall (mm)'] * input_data['Pesticide and fertilizer used (kg/hectare)']
-
-        # 3. Separate categorical and numerical features
-        cat_features = input_data[['Crop type', 'Season', 'District']]
-        # CORRECTED: Only include features the scaler was trained on
-        num_features = input_data[['Annual rainfall (mm)', 'Pesticide and fertilizer used (kg/hectare)', 'Rainfall_Pesticide']]
-
-        # 4. Apply pre-trained One-Hot Encoding and Scaling
+        # 2. Feature engineering, one-hot encoding, scaling and prediction
+        #    (one call into the pipeline fitted by the training script)
         try:
-            cat_encoded = ohe_encoder.transform(cat_features)
-            num_scaled = scaler.transform(num_features)
-
-            # 5. Combine features in the correct order
-            final_features = np.hstack([cat_encoded, num_scaled])
-
-            # 6. Make prediction
-            prediction = model.predict(final_features)
+            if inference_client.remote_enabled():
+                prediction = inference_client.predict_batch("odisha-yield", input_data)
+            else:
+                prediction = odisha_yield_predictor.predict_yield(input_data)
             predicted_yield = prediction[0]
 
             # --- DISPLAY RESULT ---
@@ -139,6 +128,58 @@ if st.sidebar.button("Predict Yield", type="primary"):
     else:
         st.warning("Cannot predict as model files are not loaded correctly. Please check that the 'models' folder exists and is populated.")
 
+# --- BULK PREDICTION (CSV/EXCEL UPLOAD) ---
+def predict_bulk(df):
+    """Returns (predictions, errors); rows with unknown categories or bad numbers are skipped, not fatal."""
+    remote = (lambda data: inference_client.predict_batch("odisha-yield", data)) \
+        if inference_client.remote_enabled() else None
+    return odisha_yield_predictor.predict_valid_rows(df, predict=remote)
+
+
+st.markdown("---")
+st.subheader("📂 Bulk Prediction (CSV/Excel Upload)")
+st.write("👉 Required columns: " + ", ".join(odisha_yield_predictor.FEATURES))
+
+file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx"])
+
+if file:
+    # Model columns are parsed with declared types, any others kept as text; a missing column fails
+    # before the rows are read, a non-numeric cell only skips its row
+    try:
+        with timed(odisha_yield_predictor.METRICS_NAME, "parse") as timer:
+            df = read_upload(file, file.name, odisha_yield_predictor.FEATURES, odisha_yield_predictor.UPLOAD_DTYPES,
+                             invalid="coerce")
+            timer.rows = len(df)
+    except SchemaError as e:
+        st.error(f"❌ {e}")
+    else:
+        if not artifacts_ready():
+            st.warning("Cannot predict as model files are not loaded correctly. Please check that the 'models' folder exists and is populated.")
+        else:
+            # Validation, feature engineering, encoding, scaling and the forest run once for the whole sheet
+            try:
+                predictions, errors = predict_bulk(df)
+            except Exception as e:
+                st.error(f"An error occurred during prediction: {e}")
+            else:
+                df['Predicted_Yield'] = predictions.round(2)
+                skipped = errors.ne("")
+                if skipped.any():
+                    df['Error'] = errors
+                    st.warning(f"⚠️ {int(skipped.sum())} of {len(df)} rows were skipped because of unknown "
+                               f"categories or missing rainfall/pesticide values.")
+
+                st.write("📊 Predicted Yield (tonnes/hectare)")
+                st.dataframe(df)
+
+                fmt = st.selectbox("Export format", available_formats(), format_func=lambda f: FORMATS[f]["label"])
+                with timed(odisha_yield_predictor.METRICS_NAME, "export", rows=len(df)):
+                    data = export_results(df, fmt, units={'Predicted_Yield': 'tonnes/hectare'})
+                st.download_button(label="📥 Download Results", data=data,
+                                   file_name=file_name('odisha_predicted_yields', fmt), mime=FORMATS[fmt]["mime"])
+
 st.markdown("---")
 st.write("Developed based on the Odisha Crop Dataset.")
 
+# Admin-only stage timings (set AGRIMEN_ADMIN)
+stage_metrics.admin_panel()
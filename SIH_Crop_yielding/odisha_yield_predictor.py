@@ -0,0 +1,131 @@
+"""
+Odisha crop yield model: artifact loading and prediction.
+
+Shared by the Streamlit app (app_yield.py) and the inference server.
+train_yield_predict.py fits ``build_preprocessor`` and saves it together with
+the forest as one pipeline, so scoring replays the training-time feature
+engineering in a single ``predict`` call.
+"""
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.category_encoder import CategoryEncoder
+from shared.manifest import load_manifest
+from shared import pipeline_artifact
+from shared.stage_metrics import timed
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+CAT_FEATURES = ['Crop type', 'Season', 'District']
+NUM_FEATURES = ['Annual rainfall (mm)', 'Pesticide and fertilizer used (kg/hectare)']
+FEATURES = CAT_FEATURES + NUM_FEATURES
+# Column types of a bulk upload (shared.upload_reader). Uploads are read with invalid="coerce",
+# so a non-numeric cell becomes NaN and clean_inputs reports it on its row
+UPLOAD_DTYPES = {**dict.fromkeys(CAT_FEATURES, "category"), **dict.fromkeys(NUM_FEATURES, "float64")}
+INTERACTION = 'Rainfall_Pesticide'
+PIPELINE_FILE = "crop_yield_pipeline.joblib"
+METRICS_NAME = "odisha-yield"
+
+
+def build_preprocessor():
+    """
+    The unfitted feature steps: the rainfall x inputs interaction, then a
+    one-hot block for the categories next to the robust-scaled numerics.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, RobustScaler
+    from shared.pipeline_steps import InteractionFeature
+
+    return Pipeline([
+        ("features", InteractionFeature(*NUM_FEATURES, INTERACTION, FEATURES)),
+        ("encode", ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown='ignore', sparse_output=False), CAT_FEATURES),
+            ("num", RobustScaler(), NUM_FEATURES + [INTERACTION]),
+        ], sparse_threshold=0)),
+    ])
+
+
+def pipeline_path(models_dir=MODELS_DIR):
+    return os.path.join(models_dir, PIPELINE_FILE)
+
+
+def load_model_manifest(models_dir=MODELS_DIR):
+    """The training manifest: input vocabularies and ranges, and the model version."""
+    return load_manifest(models_dir)
+
+
+def load_artifacts(models_dir=MODELS_DIR):
+    """Returns (pipeline, header), loaded and hash-checked on first use."""
+    return pipeline_artifact.load_pipeline(pipeline_path(models_dir))
+
+
+@lru_cache(maxsize=1)
+def load_category_encoder(models_dir=MODELS_DIR):
+    """Encoder over the manifest's vocabularies (tolerant of spacing and case)."""
+    vocabularies = load_model_manifest(models_dir)["vocabularies"]
+    return CategoryEncoder({col: vocabularies[col] for col in CAT_FEATURES})
+
+
+def _add_errors(errors, bad, message):
+    errors[bad] = np.where(errors[bad] == "", message, errors[bad] + "; " + message)
+
+
+def clean_inputs(df):
+    """
+    Returns (data, errors) for an uploaded sheet: the model columns with each
+    category in its training spelling and numerics as floats, and per-row
+    error messages ('' for rows that can be scored).
+
+    The one-hot encoder ignores unseen categories, so they are caught here
+    rather than silently scored as "none of the above".
+    """
+    encoder = load_category_encoder()
+    codes, errors = encoder.encode(df)
+    data = pd.DataFrame(index=df.index)
+    for col in CAT_FEATURES:
+        # UNKNOWN (-1) picks the trailing None
+        spellings = np.array(encoder.vocabularies[col] + [None], dtype=object)
+        data[col] = spellings[codes[col].to_numpy()]
+    for col in NUM_FEATURES:
+        data[col] = pd.to_numeric(df[col], errors="coerce")
+        bad = data[col].isna().to_numpy()
+        if bad.any():
+            _add_errors(errors, bad, f"missing or non-numeric {col}")
+    return data, errors
+
+
+def predict_yield(df):
+    """Predicts yield (tonnes/hectare) for every row of ``df``."""
+    pipeline, _ = load_artifacts()
+    rows = len(df)
+    with timed(METRICS_NAME, "features", rows=rows):
+        data = pipeline.named_steps["features"].transform(df)
+    # One-hot encoding and robust scaling run together in the ColumnTransformer
+    with timed(METRICS_NAME, "encode_scale", rows=rows):
+        X = pipeline.named_steps["encode"].transform(data)
+    with timed(METRICS_NAME, "predict", rows=rows):
+        return pipeline.named_steps["model"].predict(X)
+
+
+def predict_valid_rows(df, predict=None):
+    """
+    Scores the rows of an uploaded sheet that pass ``clean_inputs`` in one
+    batch.
+
+    Returns (predictions, errors): NaN predictions for rejected rows and the
+    reason for each. ``predict`` scores the clean rows (defaults to the local
+    pipeline).
+    """
+    with timed(METRICS_NAME, "validate", rows=len(df)):
+        data, errors = clean_inputs(df)
+    valid = errors.eq("").to_numpy()
+    predictions = np.full(len(df), np.nan)
+    if valid.any():
+        predictions[valid] = (predict or predict_yield)(data[valid])
+    return predictions, errors
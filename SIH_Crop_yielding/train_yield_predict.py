@@ -1,11 +1,49 @@
+import argparse
+import time
 import pandas as pd
-import numpy as np
-from sklearn.model_selection import train_test_split, RandomizedSearchCV, cross_val_score
-from sklearn.preprocessing import OneHotEncoder, RobustScaler
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, ParameterSampler
+from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from odisha_yield_predictor import CAT_FEATURES, FEATURES, NUM_FEATURES, PIPELINE_FILE, build_preprocessor
+from shared.dataset_cache import load_dataset
+from shared.manifest import write_manifest
+from shared.pipeline_artifact import save_pipeline
+
+DTYPES = {
+    'Crop type': 'category', 'Season': 'category', 'Year': 'category', 'State': 'category',
+    'District': 'category', 'Annual rainfall (mm)': 'float64', 'Cultivated area (hectares)': 'int64',
+    'Total production (tonnes)': 'float64', 'Pesticide and fertilizer used (kg/hectare)': 'float64',
+    'Yield (tonnes/hectare)': 'float64'
+}
+
+parser = argparse.ArgumentParser(description="Train the Odisha crop yield RandomForest model")
+parser.add_argument("--search", choices=["random", "oob"], default="random",
+                    help="random: RandomizedSearchCV (5-fold); oob: out-of-bag scoring with warm-started tree counts")
+parser.add_argument("--cpus", type=int, default=-1, help="parallel jobs for the search (default: all cores)")
+args = parser.parse_args()
+
+
+def oob_path(params, tree_counts, X, y):
+    """
+    Grows one forest through ``tree_counts`` with warm_start and returns the
+    out-of-bag R² at each size; a single fit per candidate replaces 5 CV folds
+    per (candidate, n_estimators) pair.
+    """
+    start = time.perf_counter()
+    forest = RandomForestRegressor(random_state=42, n_jobs=1, oob_score=True, warm_start=True, **params)
+    scores = []
+    for n in tree_counts:
+        forest.set_params(n_estimators=n)
+        forest.fit(X, y)
+        scores.append(forest.oob_score_)
+    return {'params': params, 'scores': scores, 'seconds': time.perf_counter() - start}
 
 # --- SETUP ---
 # Create a directory to save the models if it doesn't exist
@@ -15,7 +53,7 @@ os.makedirs('models', exist_ok=True)
 # --- DATA LOADING ---
 print("Loading dataset: 'odisha_crop_data.csv'...")
 try:
-    df = pd.read_csv('odisha_crop_data.csv')
+    df = load_dataset('odisha_crop_data.csv', DTYPES)
 except FileNotFoundError:
     print("Error: 'odisha_crop_data.csv' not found. Please place it in the same directory.")
     exit()
@@ -23,34 +61,15 @@ except FileNotFoundError:
 # --- FEATURE SELECTION (CORRECTED) ---
 # TARGET LEAKAGE FIX: Removed 'Cultivated area (hectares)' and 'Total production (tonnes)' from features
 print("Selecting features and target. 'Total production' and 'Cultivated area' are excluded from features to prevent target leakage.")
-X = df[['Crop type', 'Season', 'District', 'Annual rainfall (mm)', 'Pesticide and fertilizer used (kg/hectare)']]
+X = df[FEATURES]
 y = df['Yield (tonnes/hectare)']
 
-# --- FEATURE ENGINEERING ---
-# Create an interaction term between rainfall and pesticide/fertilizer use
-print("Performing feature engineering...")
-X = X.copy()
-X['Rainfall_Pesticide'] = X['Annual rainfall (mm)'] * X['Pesticide and fertilizer used (kg/hectare)']
-
-# --- PREPROCESSING ---
-# One-Hot Encode categorical columns
-print("Applying One-Hot Encoding for categorical features...")
-ohe = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-X_cat_encoded = ohe.fit_transform(X[['Crop type', 'Season', 'District']])
-joblib.dump(ohe, 'models/yield_ohe_encoder.pkl')
-print("Saved One-Hot Encoder to 'models/yield_ohe_encoder.pkl'")
-
-# Robust Scaling for numeric features
-print("Applying Robust Scaling for numerical features...")
-scaler = RobustScaler()
-numeric_cols = ['Annual rainfall (mm)', 'Pesticide and fertilizer used (kg/hectare)', 'Rainfall_Pesticide']
-X_num_scaled = scaler.fit_transform(X[numeric_cols])
-joblib.dump(scaler, 'models/yield_scaler.pkl')
-print("Saved Scaler to 'models/yield_scaler.pkl'")
-
-# Combine encoded categorical and scaled numerical features
-print("Combining preprocessed features...")
-X_final = np.hstack([X_cat_encoded, X_num_scaled])
+# --- FEATURE ENGINEERING AND PREPROCESSING ---
+# Rainfall x pesticide/fertilizer interaction, one-hot categories and robust-scaled
+# numerics; fitted once here and saved inside the model pipeline below
+print("Applying feature engineering, One-Hot Encoding and Robust Scaling...")
+preprocessor = build_preprocessor()
+X_final = preprocessor.fit_transform(X)
 
 # --- MODEL TRAINING ---
 # Train-test split
@@ -66,24 +85,44 @@ param_grid = {
     'max_features': ['sqrt', 0.8] # 'auto' is deprecated
 }
 
-rf = RandomForestRegressor(random_state=42, n_jobs=-1)
-
-# Randomized Search Cross-Validation
-print("\nStarting Hyperparameter Tuning with RandomizedSearchCV...")
-grid_search = RandomizedSearchCV(
-    estimator=rf,
-    param_distributions=param_grid,
-    n_iter=50, # Increased iterations for better search
-    scoring='r2',
-    cv=5,
-    verbose=1, # Reduced verbosity for cleaner output
-    random_state=42
-)
-
-grid_search.fit(X_train, y_train)
-
-best_model = grid_search.best_estimator_
-print("Hyperparameter tuning complete.")
+if args.search == "oob":
+    # Every candidate grows 100 -> 500 trees once; OOB R² at each size picks n_estimators
+    tree_counts = sorted(param_grid['n_estimators'])
+    space = {k: v for k, v in param_grid.items() if k != 'n_estimators'}
+    candidates = list(ParameterSampler(space, n_iter=50, random_state=42))
+    print(f"\nStarting OOB tuning: {len(candidates)} candidates x tree counts {tree_counts}...")
+    # Parallel over candidates, one thread per forest, so cores are never oversubscribed
+    results = Parallel(n_jobs=args.cpus)(delayed(oob_path)(params, tree_counts, X_train, y_train)
+                                         for params in candidates)
+    best_score, best_params = max(
+        ((score, {**r['params'], 'n_estimators': n}) for r in results for n, score in zip(tree_counts, r['scores'])),
+        key=lambda pair: pair[0])
+    best_model = RandomForestRegressor(random_state=42, n_jobs=args.cpus, **best_params)
+    best_model.fit(X_train, y_train)
+    print(f"Hyperparameter tuning complete ({sum(r['seconds'] for r in results):.1f}s of forest growing).")
+else:
+    # One thread per forest: the search already runs a fit per core
+    rf = RandomForestRegressor(random_state=42, n_jobs=1)
+
+    # Randomized Search Cross-Validation
+    print("\nStarting Hyperparameter Tuning with RandomizedSearchCV...")
+    grid_search = RandomizedSearchCV(
+        estimator=rf,
+        param_distributions=param_grid,
+        n_iter=50, # Increased iterations for better search
+        scoring='r2',
+        cv=5,
+        n_jobs=args.cpus,
+        verbose=1, # Reduced verbosity for cleaner output
+        random_state=42
+    )
+
+    grid_search.fit(X_train, y_train)
+
+    best_model = grid_search.best_estimator_
+    best_params = grid_search.best_params_
+    best_score = grid_search.best_score_
+    print("Hyperparameter tuning complete.")
 
 # --- MODEL EVALUATION ---
 print("\n--- Model Evaluation ---")
@@ -92,13 +131,24 @@ mae = mean_absolute_error(y_test, y_pred)
 mse = mean_squared_error(y_test, y_pred)
 r2 = r2_score(y_test, y_pred)
 
-# Cross-validation R² mean
-cv_scores = cross_val_score(best_model, X_final, y, cv=5, scoring='r2')
-cv_mean = cv_scores.mean()
+# Validation R² of the chosen configuration, as estimated by the search itself
+# (mean 5-fold CV score, or OOB score) instead of refitting 5 more forests
+score_label = "OOB R²" if args.search == "oob" else "Cross-Validated R² Mean"
 
 # --- SAVE THE FINAL MODEL ---
-joblib.dump(best_model, 'models/crop_yield_model.pkl')
-print("Saved final trained model to 'models/crop_yield_model.pkl'")
+# One artifact: raw input frame -> interaction -> encoding/scaling -> forest
+pipeline = Pipeline(preprocessor.steps + [('model', best_model)])
+header = save_pipeline(pipeline, f'models/{PIPELINE_FILE}', inputs=FEATURES,
+                       metrics={'mae': mae, 'mse': mse, 'r2': r2, 'validation_r2': best_score}, search=args.search)
+print(f"Saved model pipeline v{header['version']} to 'models/{PIPELINE_FILE}' (sha256 {header['sha256'][:12]})")
+
+# Input vocabularies and ranges for the app, straight from the fitted encoder
+ohe = preprocessor.named_steps['encode'].named_transformers_['cat']
+write_manifest('models', FEATURES,
+               vocabularies=dict(zip(CAT_FEATURES, ohe.categories_)),
+               numeric=X[NUM_FEATURES],
+               target='Yield (tonnes/hectare)')
+print("Saved input manifest to 'models/manifest.json'")
 
 # --- PRINT RESULTS ---
 print("\n--- Final Results ---")
@@ -106,7 +156,7 @@ print(f"Random Forest Model Evaluation:")
 print(f"Mean Absolute Error (MAE): {mae:.4f}")
 print(f"Mean Squared Error (MSE): {mse:.4f}")
 print(f"R² Score (on test set): {r2:.4f}")
-print(f"Cross-Validated R² Mean: {cv_mean:.4f}")
+print(f"{score_label}: {best_score:.4f}")
 print(f"\nBest Hyperparameters Found:")
-print(grid_search.best_params_)
+print(best_params)
 print("\n--- Training Script Finished ---")
@@ -1,15 +1,44 @@
 # app_price.py
 import streamlit as st
 import pandas as pd
-import joblib
+import numpy as np
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import price_predictor
+from shared import inference_client, stage_metrics
+from shared.result_export import FORMATS, available_formats, export_results, file_name
+from shared.stage_metrics import timed
+from shared.upload_reader import SchemaError, read_upload
 
 # -------------------------------
-# Load models and metadata
+# Models load on the first prediction and are kept for the process (scoring
+# goes to the inference server instead when AGRIMEN_INFERENCE_URL is set);
+# the inputs render from the JSON manifest alone
 # -------------------------------
-model = joblib.load("models/price_prediction_model.pkl")
-scaler = joblib.load("models/price_scaler.pkl")
-expected_features = joblib.load("models/feature_columns.pkl")
+
+
+def predict_price(df):
+    if inference_client.remote_enabled():
+        return inference_client.predict_batch("price", df)
+    return price_predictor.predict_price(df)
+
+
+def predict_price_with_notes(df):
+    # Locally the notes come out of the encoding that produced the prices
+    if inference_client.remote_enabled():
+        notes = price_predictor.encode_categories(df)[1] if price_predictor.is_long_format(df) else None
+        return inference_client.predict_batch("price", df), notes
+    return price_predictor.predict_price_with_notes(df)
+
+
+def predict_single(features):
+    # One-hot row is written straight into a preallocated array; no DataFrame
+    if inference_client.remote_enabled():
+        return inference_client.predict_one("price", features)
+    return price_predictor.predict_row(features)
 
 # -------------------------------
 # Multilingual dictionary
@@ -107,6 +136,8 @@ translations = {
 language = st.sidebar.selectbox("Select Language / ভাষা / భాష / மொழி / ଭାଷା / ভাষা", 
                                 ['English','Hindi','Telugu','Tamil','Odia','Bengali'])
 t = translations[language]
+manifest = price_predictor.load_model_manifest()
+st.sidebar.caption(f"Model v{manifest['version']} · trained {manifest['trained_at'][:10]}")
 
 st.title(t['title'])
 
@@ -116,13 +147,18 @@ st.title(t['title'])
 year = st.number_input(t['Year'], min_value=2000, max_value=2030, value=2025)
 month = st.number_input(t['Month'], min_value=1, max_value=12, value=9)
 day_of_week = st.number_input(t['DayOfWeek'], min_value=1, max_value=7, value=1)
+# The model needs the day's Min/Max price; defaults are the training medians
+ranges = manifest['numeric_ranges']
+min_price_input = st.number_input("Min Price (₹)", min_value=0.0, value=float(round(ranges['Min_Price']['median'])))
+max_price_input = st.number_input("Max Price (₹)", min_value=0.0, value=float(round(ranges['Max_Price']['median'])))
 
-# Get all available options from feature columns
-districts = sorted([f.replace('District_', '') for f in expected_features if f.startswith('District_')])
-markets = sorted([f.replace('Market_', '') for f in expected_features if f.startswith('Market_')])
-commodities = sorted([f.replace('Commodity_', '') for f in expected_features if f.startswith('Commodity_')])
-varieties = sorted([f.replace('Variety_', '') for f in expected_features if f.startswith('Variety_')])
-grades = sorted([f.replace('Grade_', '') for f in expected_features if f.startswith('Grade_')])
+# Options come from the training manifest, read and sorted once per process
+options = price_predictor.input_options()
+districts = options['District']
+markets = options['Market']
+commodities = options['Commodity']
+varieties = options['Variety']
+grades = options['Grade']
 
 district = st.selectbox(t['District'], districts)
 market = st.selectbox(t['Market'], markets)
@@ -137,6 +173,8 @@ submit_button = st.button(t['Predict'])
 # -------------------------------
 if submit_button:
     input_data = {
+        'Min_Price': min_price_input,
+        'Max_Price': max_price_input,
         'Year': year,
         'Month': month,
         'DayOfWeek': day_of_week,
@@ -146,11 +184,56 @@ if submit_button:
         'Variety_' + variety: 1,
         'Grade_' + grade: 1
     }
-    input_df = pd.DataFrame([input_data])
-    input_df = input_df.reindex(columns=expected_features, fill_value=0)
-    input_scaled = scaler.transform(input_df)
-    prediction = model.predict(input_scaled)[0]
-    st.success(f"{t['Predicted Price']}: ₹ {prediction:,.2f}")
+    try:
+        prediction = predict_single(input_data)
+    except (ValueError, inference_client.InferenceError) as e:
+        st.error(f"❌ {e}")
+    else:
+        st.success(f"{t['Predicted Price']}: ₹ {prediction:,.2f}")
+
+# -------------------------------
+# Scenario planner: every market x upcoming day in one batched prediction
+# -------------------------------
+def price_scenarios(commodity, variety, grade, min_price, max_price, dates):
+    markets = options['Market']
+    if inference_client.remote_enabled():
+        # Same grid sent as one long-format batch; the server encodes it
+        grid = pd.DataFrame({
+            'Market': np.repeat(markets, len(dates)),
+            'Date': np.tile(dates, len(markets)),
+        })
+        grid['District'] = grid['Market'].map(manifest['market_districts'])
+        grid = grid.assign(Commodity=commodity, Variety=variety, Grade=grade, Min_Price=min_price,
+                           Max_Price=max_price, Month=grid['Date'].dt.month, DayOfWeek=grid['Date'].dt.dayofweek)
+        grid['Predicted_Price'] = predict_price(grid.drop(columns='Date'))
+        return grid[['Market', 'District', 'Date', 'Predicted_Price']].sort_values(
+            'Predicted_Price', ascending=False, ignore_index=True)
+    features = {'Min_Price': min_price, 'Max_Price': max_price, 'Commodity_' + commodity: 1,
+                'Variety_' + variety: 1, 'Grade_' + grade: 1}
+    return price_predictor.scenario_grid(features, markets, dates)
+
+
+st.subheader("Where and when to sell")
+col1, col2, col3 = st.columns(3)
+weeks = col1.slider("Weeks ahead", min_value=1, max_value=8, value=4)
+min_price = col2.number_input("Expected Min Price (₹)", min_value=0.0, value=float(round(ranges['Min_Price']['median'])))
+max_price = col3.number_input("Expected Max Price (₹)", min_value=0.0, value=float(round(ranges['Max_Price']['median'])))
+st.caption(f"Uses the {commodity} / {variety} / {grade} selection above and compares all {len(markets)} markets.")
+
+if st.button("Compare markets and dates"):
+    dates = pd.date_range(pd.Timestamp.today().normalize() + pd.Timedelta(days=1), periods=7 * weeks)
+    scenarios = price_scenarios(commodity, variety, grade, min_price, max_price, dates)
+    st.write(f"Top options of {len(scenarios)} (market, date) pairs")
+    st.dataframe(scenarios.head(20).assign(Date=lambda d: d['Date'].dt.date))
+
+    import altair as alt
+    heatmap = alt.Chart(scenarios).mark_rect().encode(
+        x=alt.X('yearmonthdate(Date):O', title='Date'),
+        y=alt.Y('Market:N', sort=alt.EncodingSortField('Predicted_Price', op='mean', order='descending')),
+        color=alt.Color('Predicted_Price:Q', title='₹'),
+        tooltip=['Market', 'District', alt.Tooltip('Date:T'), alt.Tooltip('Predicted_Price:Q', format=',.0f')],
+    )
+    st.altair_chart(heatmap, use_container_width=True)
 
 # -------------------------------
 # Batch prediction (CSV/Excel)
@@ -158,19 +241,32 @@ if submit_button:
 st.subheader(t['Upload_File'])
 uploaded_file = st.file_uploader("", type=['csv','xlsx'])
 if uploaded_file:
-    if uploaded_file.name.endswith('.csv'):
-        df = pd.read_csv(uploaded_file)
+    # Model columns are parsed with declared types, any others kept as text; missing price/date
+    # inputs fail before the rows are read
+    columns, required, dtypes = price_predictor.upload_schema()
+    try:
+        with timed(price_predictor.METRICS_NAME, "parse") as timer:
+            df = read_upload(uploaded_file, uploaded_file.name, columns, dtypes, required)
+            timer.rows = len(df)
+    except SchemaError as e:
+        st.error(f"❌ {e}")
     else:
-        df = pd.read_excel(uploaded_file)
-
-    # Ensure all feature columns exist
-    for col in expected_features:
-        if col not in df.columns:
-            df[col] = 0
-
-    df_scaled = scaler.transform(df[expected_features])
-    predictions = model.predict(df_scaled)
-    df['Predicted_Price (₹)'] = predictions
-    st.dataframe(df)
-    df.to_csv('predicted_prices.csv', index=False)
-    st.success('Predictions saved to predicted_prices.csv')
+        # Either long format (raw District/Market/Commodity/Variety/Grade values,
+        # encoded in one pass) or one-hot columns; missing one-hot columns count as 0
+        prices, notes = predict_price_with_notes(df)
+        results = df.assign(**{'Predicted_Price (₹)': prices})
+        if notes is not None and notes.ne('').any():
+            results['Unmatched'] = notes
+            st.info(f"{int(notes.ne('').sum())} rows have categories with no model column "
+                    "(new values or the baseline category); they are scored as the baseline.")
+        st.dataframe(results)
+
+        # Served as a download; nothing is written to the server's disk
+        fmt = st.selectbox("Export format", available_formats(), format_func=lambda f: FORMATS[f]["label"])
+        with timed(price_predictor.METRICS_NAME, "export", rows=len(results)):
+            data = export_results(results, fmt)
+        st.download_button(label="📥 " + t['Predicted Price'], data=data,
+                           file_name=file_name('predicted_prices', fmt), mime=FORMATS[fmt]["mime"])
+
+# Admin-only stage timings (set AGRIMEN_ADMIN)
+stage_metrics.admin_panel()
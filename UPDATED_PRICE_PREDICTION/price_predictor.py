@@ -0,0 +1,250 @@
+"""
+Market price model: artifact loading and prediction.
+
+Shared by the Streamlit app (app_price.py) and the inference server so both
+build the one-hot feature frame the same way. The model is one fused,
+hash-checked artifact (shared.pipeline_artifact), loaded once per process. joblib, scipy and xgboost are imported on first use, so
+the app renders its inputs (from the JSON manifest) without them.
+"""
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared import pipeline_artifact
+from shared.category_encoder import CategoryEncoder
+from shared.manifest import load_manifest
+from shared.stage_metrics import timed
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+# Raw columns of a long-format upload; each expands to the "<column>_<value>" one-hot features
+CATEGORY_COLUMNS = ['District', 'Market', 'Commodity', 'Variety', 'Grade']
+METRICS_NAME = "price"
+
+
+def pipeline_path(models_dir=MODELS_DIR):
+    from shared.sparse_features import PIPELINE_FILE
+
+    return os.path.join(models_dir, PIPELINE_FILE)
+
+
+def load_artifacts(models_dir=MODELS_DIR):
+    """
+    Returns (model, scaler, expected_features) from the fused pipeline,
+    loaded and hash-checked on first use.
+    """
+    from shared.sparse_features import split_pipeline
+
+    pipeline, _ = pipeline_artifact.load_pipeline(pipeline_path(models_dir))
+    return split_pipeline(pipeline)
+
+
+@lru_cache(maxsize=1)
+def load_row_encoder(models_dir=MODELS_DIR):
+    """
+    Returns (index, base, mean, scale, n_numeric) for building rows without pandas.
+
+    ``index`` maps feature name -> column position; ``base`` is the row for
+    all-zero inputs, so only the few non-zero inputs need to be written.
+    """
+    from shared.sparse_features import row_template
+
+    _, scaler, expected_features = load_artifacts(models_dir)
+    return row_template(expected_features, scaler)
+
+
+def encode_row(features):
+    """
+    1 x n feature row for ``features`` (name -> value, e.g. 'Month': 9,
+    'Market_Guntur': 1). Numeric values are scaled; one-hot slots that are not
+    set stay missing, as in the sparse batch matrix. Names that are not model
+    features are ignored, like the batch path's reindex.
+    """
+    index, base, mean, scale, n_numeric = load_row_encoder()
+    row = base.copy()
+    for name, value in features.items():
+        i = index.get(name)
+        if i is None:
+            continue
+        if i < n_numeric:
+            row[i] = (value - mean[i]) / scale[i]
+        elif value:
+            row[i] = 1.0
+    return row[np.newaxis, :]
+
+
+def predict_row(features):
+    """
+    Predicts the modal price for one input dict (see ``encode_row``). Raises
+    ValueError when a numeric input (Min_Price, Max_Price, ...) is missing.
+    """
+    from shared.sparse_features import require_columns
+
+    model, scaler, _ = load_artifacts()
+    require_columns(features, scaler.feature_names_in_)
+    with timed(METRICS_NAME, "encode_row", rows=1):
+        row = encode_row(features)
+    with timed(METRICS_NAME, "predict", rows=1):
+        return float(model.predict(row)[0])
+
+
+def load_model_manifest(models_dir=MODELS_DIR):
+    """The training manifest: feature order, vocabularies, input ranges and model version."""
+    return load_manifest(models_dir)
+
+
+def scenario_grid(features, markets, dates):
+    """
+    Predicts every (market, date) pair in one batched call.
+
+    ``features`` holds the inputs shared by all scenarios (Min_Price,
+    Max_Price and the Commodity_/Variety_/Grade_ one-hots, as for
+    ``encode_row``). Each row then gets its market, that market's district,
+    and Month/DayOfWeek of its date. Returns a frame of Market, District,
+    Date and Predicted_Price sorted from the best price down.
+    """
+    with timed(METRICS_NAME, "scenario_grid") as timer:
+        index, _, mean, scale, _ = load_row_encoder()
+        market_districts = load_model_manifest()["market_districts"]
+        dates = pd.DatetimeIndex(dates)
+        n_markets, n_dates = len(markets), len(dates)
+        rows = np.arange(n_markets * n_dates)
+        timer.rows = len(rows)
+
+        grid = np.repeat(encode_row(features), len(rows), axis=0)
+        grid[rows, np.repeat([index[f"Market_{m}"] for m in markets], n_dates)] = 1.0
+        districts = [market_districts.get(m) for m in markets]
+        # The baseline district has no one-hot column, so its markets leave the District block unset
+        has_district = np.repeat([f"District_{d}" in index for d in districts], n_dates)
+        district_cols = np.repeat([index.get(f"District_{d}", 0) for d in districts], n_dates)
+        grid[rows[has_district], district_cols[has_district]] = 1.0
+        for name, values in (("Month", dates.month), ("DayOfWeek", dates.dayofweek)):
+            i = index.get(name)
+            if i is not None:
+                grid[:, i] = np.tile((np.asarray(values, dtype=np.float64) - mean[i]) / scale[i], n_markets)
+
+    model = load_artifacts()[0]
+    with timed(METRICS_NAME, "predict", rows=len(rows)):
+        predictions = model.predict(grid)
+    result = pd.DataFrame({
+        "Market": np.repeat(markets, n_dates),
+        "District": np.repeat(districts, n_dates),
+        "Date": np.tile(dates, n_markets),
+        "Predicted_Price": predictions,
+    })
+    return result.sort_values("Predicted_Price", ascending=False, ignore_index=True)
+
+
+@lru_cache(maxsize=1)
+def input_options(models_dir=MODELS_DIR):
+    """Sorted choices per raw category column, from the training manifest."""
+    manifest = load_model_manifest(models_dir)
+    baselines = manifest.get("baselines", {})
+    # The baseline level has no one-hot column but is a valid input
+    return {col: sorted(manifest["vocabularies"][col] + ([baselines[col]] if col in baselines else []))
+            for col in CATEGORY_COLUMNS}
+
+
+@lru_cache(maxsize=1)
+def load_category_encoder(models_dir=MODELS_DIR):
+    """Vocabulary encoder for the raw category columns (the manifest lists them in one-hot order)."""
+    manifest = load_model_manifest(models_dir)
+    return CategoryEncoder({col: manifest["vocabularies"][col] for col in CATEGORY_COLUMNS},
+                           manifest.get("baselines"))
+
+
+@lru_cache(maxsize=1)
+def upload_schema(models_dir=MODELS_DIR):
+    """
+    Returns (columns, required, dtypes) for reading a bulk upload with
+    shared.upload_reader: every model feature and raw category column may be
+    present, the numeric inputs must be.
+    """
+    manifest = load_model_manifest(models_dir)
+    numeric = list(manifest["numeric_ranges"])
+    dtypes = {col: "float64" if col in numeric else "uint8" for col in manifest["features"]}
+    dtypes.update(dict.fromkeys(CATEGORY_COLUMNS, "category"))
+    return manifest["features"] + CATEGORY_COLUMNS, numeric, dtypes
+
+
+def is_long_format(df):
+    """True when ``df`` carries raw category columns rather than one-hot ones."""
+    return any(col in df.columns for col in CATEGORY_COLUMNS)
+
+
+def encode_categories(df):
+    """
+    Returns (codes, notes) for the raw category columns of ``df``.
+
+    A value with no one-hot column scores as all zeros for that column. For
+    the category dropped as the baseline during training (the manifest's
+    ``baselines``) that is its encoding; any other such value is out of the
+    vocabulary and ``notes`` names it per row ('' when every value matched).
+    """
+    return load_category_encoder().encode(df.reindex(columns=CATEGORY_COLUMNS))
+
+
+def build_long_matrix(df):
+    """
+    (sparse model input, notes) for a long-format frame, built in one pass
+    over the category codes; ``notes`` is as in ``encode_categories``.
+    """
+    import scipy.sparse as sp
+    from shared.sparse_features import require_columns, with_numeric
+
+    _, scaler, _ = load_artifacts()
+    require_columns(df.columns, scaler.feature_names_in_)
+    index, _, _, _, n_numeric = load_row_encoder()
+    encoder = load_category_encoder()
+    with timed(METRICS_NAME, "encode", rows=len(df)):
+        codes, notes = encode_categories(df)
+        rows, cols = [], []
+        for col in CATEGORY_COLUMNS:
+            positions = np.array([index[f"{col}_{v}"] - n_numeric for v in encoder.vocabularies[col]],
+                                 dtype=np.int64)
+            c = codes[col].to_numpy()
+            # UNKNOWN and BASELINE (both negative) leave the column's one-hots unset
+            known = np.flatnonzero(c >= 0)
+            rows.append(known)
+            cols.append(positions[c[known]])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        block = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                              shape=(len(df), len(index) - n_numeric))
+    with timed(METRICS_NAME, "scale", rows=len(df)):
+        numeric = scaler.transform(df.reindex(columns=scaler.feature_names_in_, fill_value=0))
+    return with_numeric(numeric, block), notes
+
+
+def predict_price(df):
+    """
+    Predicts the modal price for every row of ``df``.
+
+    Rows either use the training column names (one-hot columns that are
+    absent are treated as 0) or are long-format with raw District/Market/
+    Commodity/Variety/Grade values. Either way the numeric inputs must be
+    present, otherwise ValueError is raised. Only the numeric columns are
+    scaled and the one-hot block is scored as a sparse matrix.
+    """
+    return predict_price_with_notes(df)[0]
+
+
+def predict_price_with_notes(df):
+    """
+    (prices, notes) for ``df`` as in ``predict_price``. ``notes`` comes from
+    the same category encoding as the prices (see ``encode_categories``);
+    it is None for one-hot input.
+    """
+    from shared.sparse_features import build_matrix
+
+    model, scaler, expected_features = load_artifacts()
+    notes = None
+    if is_long_format(df):
+        X, notes = build_long_matrix(df)
+    else:
+        X = build_matrix(df, scaler, expected_features, METRICS_NAME)
+    with timed(METRICS_NAME, "predict", rows=len(df)):
+        return model.predict(X), notes
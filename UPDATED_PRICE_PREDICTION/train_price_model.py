@@ -1,13 +1,44 @@
+import argparse
 import pandas as pd
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, ParameterSampler
 from sklearn.preprocessing import StandardScaler
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.dataset_cache import load_dataset
+from shared.manifest import write_manifest
+from shared.pipeline_artifact import save_pipeline
+from shared.sparse_features import PIPELINE_FILE, build_pipeline, fit_matrix
+from shared.xgb_search import budgeted_search
+
+parser = argparse.ArgumentParser(description="Train the market price XGBoost model")
+parser.add_argument("--search", choices=["random", "budgeted"], default="random",
+                    help="random: RandomizedSearchCV; budgeted: successive halving with early stopping (shared/xgb_search.py)")
+parser.add_argument("--cpus", type=int, default=None, help="total CPU threads for the search (default: all)")
+args = parser.parse_args()
+
+
+def market_dtypes(columns):
+    """Prices as float, date parts as small ints, the one-hot District/Market/... block as uint8."""
+    prices = ['Min_Price', 'Max_Price', 'Modal_Price']
+    dates = ['Year', 'Month', 'DayOfWeek']
+    return {c: 'float64' if c in prices else 'int16' if c in dates else 'uint8' for c in columns}
+
+
+NUMERIC_COLUMNS = ['Min_Price', 'Max_Price', 'Year', 'Month', 'DayOfWeek']
+CATEGORY_COLUMNS = ['District', 'Market', 'Commodity', 'Variety', 'Grade']
+# market.csv is already one-hot encoded with the first level of each column dropped (its rows have
+# none of that column's one-hots set) and does not name those levels. These are the ones the data
+# pins down: the Anantapur and Hindupur markets only occur with no District column set, and FAQ is
+# the Agmarknet grade sorting before Large. The Market/Commodity/Variety baselines are unknown.
+BASELINES = {'District': 'Anantapur', 'Grade': 'FAQ'}
 
 # Step 1: Load dataset
-df = pd.read_csv('market.csv')
+df = load_dataset('market.csv', market_dtypes)
 
 print(f"Columns in dataset: {df.columns.tolist()}")
 
@@ -18,13 +49,13 @@ df = df.loc[:, (df != df.iloc[0]).any()]
 X = df.drop(['Modal_Price'], axis=1)
 y = df['Modal_Price']
 
-# Step 4: Data Scaling
+# Step 4: Data Scaling (numeric columns only; the one-hot block stays a sparse CSR matrix)
 scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+X_sparse, feature_columns = fit_matrix(X, NUMERIC_COLUMNS, scaler)
 
 # Step 5: Train-Test Split
 X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.2, random_state=42
+    X_sparse, y, test_size=0.2, random_state=42
 )
 
 # Step 6: Hyperparameter Tuning (RandomizedSearchCV)
@@ -35,21 +66,34 @@ param_distributions = {
     'subsample': [0.7, 0.8, 0.9, 1.0]
 }
 
-random_search = RandomizedSearchCV(
-    estimator=XGBRegressor(objective='reg:squarederror', random_state=42),
-    param_distributions=param_distributions,
-    n_iter=15,
-    scoring='r2',
-    cv=5,
-    n_jobs=-1,
-    verbose=1,
-    random_state=42
-)
+if args.search == "budgeted":
+    # Successive halving can afford more candidates than the 15 random trials
+    candidates = list(ParameterSampler(param_distributions, n_iter=27, random_state=42))
+    best, _ = budgeted_search(X_train, y_train.to_numpy(), candidates,
+                              cpu_budget=args.cpus, base_params={'seed': 42})
+    best_params = {**best['params'], 'n_estimators': best['best_iteration']}
+    print(f"Best parameters: {best_params}")
+else:
+    # One thread per XGBRegressor: the search already runs a fit per core
+    random_search = RandomizedSearchCV(
+        estimator=XGBRegressor(objective='reg:squarederror', random_state=42, n_jobs=1),
+        param_distributions=param_distributions,
+        n_iter=15,
+        scoring='r2',
+        cv=5,
+        n_jobs=args.cpus or -1,
+        verbose=1,
+        random_state=42
+    )
 
-random_search.fit(X_train, y_train)
+    random_search.fit(X_train, y_train)
 
 # Step 7: Best Model
-best_model = random_search.best_estimator_
+if args.search == "budgeted":
+    best_model = XGBRegressor(objective='reg:squarederror', random_state=42, n_jobs=args.cpus, **best_params)
+    best_model.fit(X_train, y_train)
+else:
+    best_model = random_search.best_estimator_
 
 # Step 8: Model Evaluation
 y_pred = best_model.predict(X_test)
@@ -63,9 +107,20 @@ print(f"MSE: {mse:.2f}")
 print(f"R² Score: {r2:.4f}")
 
 # Step 9: Save Artifacts
-os.makedirs("models", exist_ok=True)
-joblib.dump(best_model, "models/price_prediction_model.pkl")
-joblib.dump(scaler, "models/price_scaler.pkl")
-joblib.dump(X.columns.tolist(), "models/feature_columns.pkl")
+# One fused, hash-checked pipeline (scaler + feature order -> native booster) for the apps
+header = save_pipeline(build_pipeline(best_model, scaler, feature_columns), f"models/{PIPELINE_FILE}",
+                       inputs=list(scaler.feature_names_in_), metrics={'mae': mae, 'mse': mse, 'r2': r2})
+# Each market lies in one district; the app's scenario planner needs the pairing.
+# The one-hot columns are uint8, so count in int64 or the row counts wrap at 256
+co_occurrence = X.filter(regex='^Market_').astype('int64').T.dot(X.filter(regex='^District_').astype('int64'))
+# A market seen with no District column set is in the baseline district
+market_districts = {m[len('Market_'):]: co_occurrence.loc[m].idxmax()[len('District_'):]
+                    if co_occurrence.loc[m].max() > 0 else BASELINES.get('District') for m in co_occurrence.index}
+# Feature order, one-hot vocabularies and input ranges for the app
+write_manifest("models", feature_columns,
+               vocabularies={col: [c[len(col) + 1:] for c in feature_columns if c.startswith(col + '_')]
+                             for col in CATEGORY_COLUMNS},
+               numeric=X[[c for c in feature_columns if c in NUMERIC_COLUMNS]], target='Modal_Price',
+               market_districts=market_districts, baselines=BASELINES)
 
-print("\nModel, Scaler, and Feature Columns saved successfully in 'models/' folder!")
+print(f"\nPipeline v{header['version']} saved to 'models/{PIPELINE_FILE}' (sha256 {header['sha256'][:12]})")
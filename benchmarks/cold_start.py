@@ -0,0 +1,153 @@
+"""
+Cold-start benchmark for the five Streamlit apps.
+
+Each app is run in a fresh interpreter through Streamlit's AppTest, which is
+the same script execution a new session triggers, only without a browser.
+Every run uses the app's own folder and has AGRIMEN_INFERENCE_URL unset.
+For each app it reports the median of:
+
+- process_ms: wall time of the whole child process (interpreter, Streamlit
+  and the first run of the app script),
+- first_render_ms: time of the first script run, until every widget of the
+  initial page has been produced,
+- import_ms: time spent importing modules during that run (from
+  ``python -X importtime``; Streamlit's own import is not counted),
+
+and which of sklearn / scipy / xgboost / joblib the first render pulled in.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 3 --save benchmarks/cold_start_baseline.json
+    python benchmarks/cold_start.py --baseline benchmarks/cold_start_baseline.json
+
+With --baseline the exit status is 1 when an app's first render is more than
+--tolerance slower than the baseline, so startup regressions fail CI.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "agrimen": "AgriMen/app.py",
+    "crop-yield": "CROP_YIELDING/app_yield.py",
+    "odisha-yield": "SIH_Crop_yielding/app_yield.py",
+    "price": "PRICE_PREDICTION/app_price.py",
+    "updated-price": "UPDATED_PRICE_PREDICTION/app_price.py",
+}
+HEAVY_MODULES = ["sklearn", "scipy", "xgboost", "joblib"]
+MARKER = "cold_start: app run begins"
+
+
+def import_ms(stderr):
+    """Total cumulative time of the top-level imports logged after MARKER by -X importtime."""
+    total_us = 0
+    started = False
+    for line in stderr.splitlines():
+        if MARKER in line:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        # Nested imports are indented under their parent; only count the outermost
+        if len(parts) == 3 and parts[1].strip().isdigit() and not parts[2][1:].startswith(" "):
+            total_us += int(parts[1])
+    return total_us / 1000
+
+
+def run_child(script):
+    """Runs ``script`` once with AppTest and prints its timings as JSON (child process side)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(script, default_timeout=300)
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "first_render_ms": elapsed * 1000,
+        "heavy": [m for m in HEAVY_MODULES if m in sys.modules],
+        "errors": [e.message for e in app.exception],
+    }))
+
+
+def measure(name, runs):
+    """Median timings of ``runs`` cold starts of app ``name``."""
+    script = os.path.join(ROOT, APPS[name])
+    env = {k: v for k, v in os.environ.items() if k != "AGRIMEN_INFERENCE_URL"}
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child", script],
+                              cwd=os.path.dirname(script), env=env, capture_output=True, text=True)
+        process_ms = (time.perf_counter() - start) * 1000
+        if proc.returncode != 0:
+            raise RuntimeError(f"{name}: benchmark child failed\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result.update(process_ms=process_ms, import_ms=import_ms(proc.stderr))
+        samples.append(result)
+    return {
+        **{key: statistics.median(s[key] for s in samples)
+           for key in ("process_ms", "first_render_ms", "import_ms")},
+        "heavy": samples[-1]["heavy"],
+        "errors": samples[-1]["errors"],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Names of the apps whose first render regressed by more than ``tolerance``."""
+    regressed = []
+    for name, result in results.items():
+        before = baseline.get("apps", {}).get(name)
+        if before and result["first_render_ms"] > before["first_render_ms"] * (1 + tolerance):
+            regressed.append(name)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-render and import time of every app.")
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=list(APPS))
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per app (median is reported)")
+    parser.add_argument("--save", help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="JSON from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed first-render slowdown over the baseline (default 0.25 = 25%%)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    results = {}
+    print(f"{'app':<15}{'process':>10}{'render':>10}{'imports':>10}  heavy modules at first render")
+    for name in args.apps:
+        result = results[name] = measure(name, args.runs)
+        print(f"{name:<15}{result['process_ms']:>8.0f}ms{result['first_render_ms']:>8.0f}ms"
+              f"{result['import_ms']:>8.0f}ms  {', '.join(result['heavy']) or '-'}")
+        for error in result["errors"]:
+            print(f"{'':<15}  script error: {error}")
+
+    from importlib.metadata import version
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+              "streamlit": version("streamlit"), "runs": args.runs, "apps": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+        if regressed:
+            print(f"Startup regression (> {args.tolerance:.0%} slower first render): {', '.join(regressed)}")
+            sys.exit(1)
+        print("No startup regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Inference benchmark for every model's predict path.
+
+The bundled datasets are the fixtures. Bulk inputs are rows drawn from them
+with replacement (fixed seed), so 1M rows need no extra files. Each case runs
+in its own interpreter, so peak RSS belongs to that model alone. A case
+reports:
+
+- load_ms: the first one-row prediction, including loading the artifacts,
+- p50_ms / p90_ms / p99_ms: latency of single-row predictions made the way
+  the app's manual form makes them,
+- rows_per_s at every bulk size (default 1k, 100k and 1M rows),
+- peak_rss_mb: the process high-water mark after the largest batch.
+
+Cases (both price apps ship the same model, and the last two cases cover
+their two input formats):
+
+  recommend      AgriMen crop_recommender.recommend  final_crop_dataset.csv
+  yield          crop_yield_predictor.predict_yield  crop_yield.csv
+  odisha-yield   odisha_yield_predictor.predict_yield  odisha_crop_data.csv
+  price          price_predictor.predict_price, one-hot columns  market.csv
+  price-long     raw District/Market/... columns; single rows via predict_row
+
+    python benchmarks/inference.py
+    python benchmarks/inference.py --cases yield price --sizes 1000 100000
+    python benchmarks/inference.py --save benchmarks/inference_baseline.json
+    python benchmarks/inference.py --baseline benchmarks/inference_baseline.json
+
+With --baseline the exit status is 1 when a latency, throughput or peak RSS
+figure is more than --tolerance worse than the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = ["recommend", "yield", "odisha-yield", "price", "price-long"]
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+SEED = 42
+# metric -> True when higher is better
+METRICS = {"p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def peak_rss_mb():
+    if resource is None:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Cases -------------------------------------------------------------------
+# Each returns (frame, predict, single_inputs, predict_single): ``frame`` is
+# the fixture in the app's input format, ``predict`` scores a frame, and
+# ``single_inputs(frame, positions)`` builds the one-row inputs that
+# ``predict_single`` takes.
+
+def _use(folder):
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+
+def _fixture(path, dtypes=None):
+    from shared.dataset_cache import load_dataset
+
+    return load_dataset(os.path.join(ROOT, path), dtypes)
+
+
+def _row_frames(frame, positions):
+    return [frame.iloc[[i]] for i in positions]
+
+
+def _recommend():
+    _use("AgriMen")
+    import crop_recommender
+
+    frame = _fixture("AgriMen/final_crop_dataset.csv").rename(columns={"n": "N", "p": "P", "k": "K"})
+    return frame[crop_recommender.FEATURES], crop_recommender.recommend, _row_frames, crop_recommender.recommend
+
+
+def _yield():
+    _use("CROP_YIELDING")
+    import crop_yield_predictor
+
+    frame = _fixture("CROP_YIELDING/crop_yield.csv")[crop_yield_predictor.FEATURES]
+    return frame, crop_yield_predictor.predict_yield, _row_frames, crop_yield_predictor.predict_yield
+
+
+def _odisha_yield():
+    _use("SIH_Crop_yielding")
+    import odisha_yield_predictor
+
+    frame = _fixture("SIH_Crop_yielding/odisha_crop_data.csv")[odisha_yield_predictor.FEATURES]
+    return frame, odisha_yield_predictor.predict_yield, _row_frames, odisha_yield_predictor.predict_yield
+
+
+def _market():
+    _use("UPDATED_PRICE_PREDICTION")
+    import price_predictor
+
+    def dtypes(columns):
+        return {c: "float64" if c.endswith("_Price") else "int16" if c in ("Year", "Month", "DayOfWeek") else "uint8"
+                for c in columns}
+
+    return price_predictor, _fixture("UPDATED_PRICE_PREDICTION/market.csv", dtypes).drop(columns="Modal_Price")
+
+
+def _price():
+    price_predictor, frame = _market()
+    return frame, price_predictor.predict_price, _row_frames, price_predictor.predict_price
+
+
+def _price_long():
+    import numpy as np
+    import pandas as pd
+
+    price_predictor, wide = _market()
+    vocabularies = price_predictor.load_model_manifest()["vocabularies"]
+    one_hot = [c for c in wide.columns if c.startswith(tuple(f"{col}_" for col in price_predictor.CATEGORY_COLUMNS))]
+    numeric = [c for c in wide.columns if c not in set(one_hot)]
+    frame = wide[numeric].copy()
+    for col in price_predictor.CATEGORY_COLUMNS:
+        # One-hot block back to the raw value; rows with none set stay missing
+        names = [v for v in vocabularies[col] if f"{col}_{v}" in wide.columns]
+        block = wide[[f"{col}_{v}" for v in names]].to_numpy()
+        values = np.array(names + [None], dtype=object)
+        frame[col] = pd.Series(values[np.where(block.any(axis=1), block.argmax(axis=1), len(names))],
+                               index=wide.index)
+
+    def feature_dicts(_, positions):
+        # The manual form's input: the numeric values plus the one-hot names that are set
+        values, flags = wide[numeric].to_numpy(), wide[one_hot].to_numpy()
+        names = np.array(one_hot)
+        return [{**dict(zip(numeric, values[i])), **dict.fromkeys(names[flags[i] == 1], 1)} for i in positions]
+
+    return frame, price_predictor.predict_price, feature_dicts, price_predictor.predict_row
+
+
+CASE_SETUP = {"recommend": _recommend, "yield": _yield, "odisha-yield": _odisha_yield,
+              "price": _price, "price-long": _price_long}
+
+
+# --- Measurement (child process) ----------------------------------------------
+
+def run_case(name, sizes, singles):
+    import numpy as np
+
+    rng = np.random.default_rng(SEED)
+    frame, predict, single_inputs, predict_single = CASE_SETUP[name]()
+    rows = single_inputs(frame, rng.integers(0, len(frame), singles + 1))
+
+    start = time.perf_counter()
+    predict_single(rows[0])
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = np.empty(singles)
+    for i, row in enumerate(rows[1:]):
+        start = time.perf_counter()
+        predict_single(row)
+        latencies[i] = time.perf_counter() - start
+    p50, p90, p99 = np.percentile(latencies * 1000, [50, 90, 99])
+
+    throughput = {}
+    for n in sizes:
+        batch = frame.iloc[rng.integers(0, len(frame), n)].reset_index(drop=True)
+        # Small batches are repeated so the timing is not dominated by noise
+        repeats = max(1, min(5, 100_000 // n))
+        seconds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict(batch)
+            seconds.append(time.perf_counter() - start)
+        throughput[str(n)] = n / float(np.median(seconds))
+        del batch
+
+    return {"load_ms": load_ms, "p50_ms": p50, "p90_ms": p90, "p99_ms": p99,
+            "rows_per_s": throughput, "peak_rss_mb": peak_rss_mb()}
+
+
+def measure(name, sizes, singles):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name,
+                           "--sizes", *map(str, sizes), "--singles", str(singles)],
+                          env={k: v for k, v in os.environ.items() if k != "AGRIMEN_INFERENCE_URL"},
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name}: benchmark child failed\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# --- Baseline comparison -------------------------------------------------------
+
+def compare(results, baseline, tolerance):
+    """Human-readable regressions of ``results`` against ``baseline`` beyond ``tolerance``."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get("cases", {}).get(name)
+        if not before:
+            continue
+        figures = [(metric, before[metric], result[metric], higher) for metric, higher in METRICS.items()]
+        figures += [(f"rows_per_s@{n}", before["rows_per_s"][n], rate, True)
+                    for n, rate in result["rows_per_s"].items() if n in before["rows_per_s"]]
+        for metric, old, new, higher_is_better in figures:
+            worse = new < old * (1 - tolerance) if higher_is_better else new > old * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name} {metric}: {old:,.2f} -> {new:,.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-row latency, bulk throughput and peak RSS.")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="bulk batch sizes in rows")
+    parser.add_argument("--singles", type=int, default=500, help="single-row predictions timed per case")
+    parser.add_argument("--save", help="write the results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="JSON from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown / growth over the baseline (default 0.25 = 25%%)")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.sizes, args.singles)))
+        return
+
+    sizes = sorted(args.sizes)
+    print(f"{'case':<14}{'load':>9}{'p50':>9}{'p90':>9}{'p99':>9}"
+          + "".join(f"{f'rows/s@{n:,}':>17}" for n in sizes) + f"{'peak RSS':>11}")
+    results = {}
+    for name in args.cases:
+        r = results[name] = measure(name, sizes, args.singles)
+        print(f"{name:<14}{r['load_ms']:>7.0f}ms{r['p50_ms']:>7.2f}ms{r['p90_ms']:>7.2f}ms{r['p99_ms']:>7.2f}ms"
+              + "".join(f"{r['rows_per_s'][str(n)]:>17,.0f}" for n in sizes) + f"{r['peak_rss_mb']:>9.0f}MB")
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+              "sizes": sizes, "singles": args.singles, "cases": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressions (> {args.tolerance:.0%} worse than the baseline):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Helpers shared by the AGRIMEN apps, trainers and the inference server.
+
+The apps are run with ``streamlit run`` from inside their own folders, so each
+entry point puts the repository root on ``sys.path`` before importing from here.
+"""
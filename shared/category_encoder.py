@@ -0,0 +1,79 @@
+"""
+Vocabulary-to-code encoding for categorical model inputs.
+
+A fitted LabelEncoder rejects a whole column as soon as one value is unseen,
+and the training vocabularies keep incidental whitespace ("Whole Year ").
+``CategoryEncoder`` precomputes one hash table per column keyed on a
+normalized spelling (trimmed, inner whitespace collapsed, case-folded). A
+batch is encoded by normalizing each distinct value once and taking the codes
+for every row in one array lookup; unseen values get ``UNKNOWN`` instead of
+raising so callers can report and skip just those rows. A one-hot model's
+baseline level (the category dropped during training) is known but has no
+code of its own; it encodes as ``BASELINE`` and is not an error.
+"""
+import numpy as np
+import pandas as pd
+
+UNKNOWN = -1
+BASELINE = -2
+
+
+def normalize(value):
+    """Canonical spelling used for lookups; None for missing values."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return " ".join(str(value).split()).casefold()
+
+
+class CategoryEncoder:
+    """
+    Encodes categorical columns to the integer codes a model was trained on.
+
+    ``vocabularies`` maps column name -> sequence of training categories, in
+    code order (e.g. a LabelEncoder's ``classes_``). ``baselines`` optionally
+    maps column name -> the category a one-hot encoding dropped.
+    """
+
+    def __init__(self, vocabularies, baselines=None):
+        self.vocabularies = {col: list(values) for col, values in vocabularies.items()}
+        self.baselines = {col: value for col, value in (baselines or {}).items() if col in self.vocabularies}
+        self.tables = {}
+        for col, values in self.vocabularies.items():
+            table = {}
+            for code, value in enumerate(values):
+                table.setdefault(normalize(value), code)
+            if col in self.baselines:
+                table.setdefault(normalize(self.baselines[col]), BASELINE)
+            self.tables[col] = table
+
+    @property
+    def columns(self):
+        return list(self.vocabularies)
+
+    def encode_column(self, col, values):
+        """Returns an int array of codes for ``values`` (UNKNOWN where unseen or missing, BASELINE for the baseline)."""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        table = self.tables[col]
+        lookup = np.fromiter((table.get(normalize(u), UNKNOWN) for u in uniques),
+                             dtype=np.int64, count=len(uniques))
+        # Append UNKNOWN so factorize's -1 sentinel for missing values maps to it
+        return np.append(lookup, UNKNOWN)[codes]
+
+    def encode(self, df):
+        """
+        Encodes every vocabulary column of ``df``.
+
+        Returns (codes, errors): a DataFrame of int codes with ``df``'s index,
+        and a Series of per-row error messages ('' for rows that encoded cleanly).
+        """
+        codes = pd.DataFrame({col: self.encode_column(col, df[col].to_numpy(dtype=object))
+                              for col in self.columns}, index=df.index)
+        errors = pd.Series("", index=df.index, dtype=object)
+        for col in self.columns:
+            bad = codes[col].to_numpy() == UNKNOWN
+            if bad.any():
+                shown = df[col].to_numpy(dtype=object)[bad]
+                messages = [f"missing {col}" if normalize(v) is None else f"unknown {col} {v!r}" for v in shown]
+                errors[bad] = np.where(errors[bad] == "", messages,
+                                       errors[bad].str.cat(messages, sep="; "))
+        return codes, errors
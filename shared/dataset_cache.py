@@ -0,0 +1,81 @@
+"""
+Columnar cache for the raw training datasets.
+
+Each CSV/Excel source is parsed once with explicit dtypes and written as
+Parquet next to it (in a ``.cache/`` folder). Later loads read the Parquet
+file, which is much faster than re-parsing text or xlsx. The cache file name
+carries a checksum of the source, so editing the source file makes the next
+load parse it again. It also carries a hash of the dtypes, so a caller that
+changes its dtypes gets a fresh parse rather than the old types.
+
+Falls back to parsing the source directly when pyarrow is not installed.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+CACHE_DIRNAME = ".cache"
+
+
+def file_checksum(path, block_size=1 << 20):
+    """BLAKE2b digest of the file contents (hex, 16 chars)."""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dtypes_key(dtypes):
+    """Short hash of a column -> dtype mapping, normalized so equivalent spellings match."""
+    normalized = {str(col): str(pd.api.types.pandas_dtype(dtype)) for col, dtype in (dtypes or {}).items()}
+    digest = hashlib.blake2b(json.dumps(normalized, sort_keys=True).encode("utf-8"), digest_size=4)
+    return digest.hexdigest()
+
+
+def _parse(source, dtypes):
+    if source.endswith((".xlsx", ".xls")):
+        df = pd.read_excel(source)
+        return df.astype(dtypes) if dtypes else df
+    return pd.read_csv(source, dtype=dtypes)
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_dataset(source, dtypes=None):
+    """
+    Loads ``source`` (CSV or Excel) through the Parquet cache.
+
+    ``dtypes`` is a column -> dtype dict, or a callable taking the list of
+    column names and returning one (handy for wide one-hot files).
+    """
+    if callable(dtypes):
+        header = pd.read_excel(source, nrows=0) if source.endswith((".xlsx", ".xls")) else pd.read_csv(source, nrows=0)
+        dtypes = dtypes(list(header.columns))
+
+    if not _has_pyarrow():
+        return _parse(source, dtypes)
+
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(source)), CACHE_DIRNAME)
+    stem = os.path.basename(source)
+    checksum = file_checksum(source)
+    cache_path = os.path.join(cache_dir, f"{stem}.{checksum}.{dtypes_key(dtypes)}.parquet")
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+
+    df = _parse(source, dtypes)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Drop caches of earlier versions of this source; other dtypes of this version are kept
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}.") and name.endswith(".parquet") and not name.startswith(f"{stem}.{checksum}."):
+            os.remove(os.path.join(cache_dir, name))
+    df.to_parquet(cache_path, index=False)
+    return df
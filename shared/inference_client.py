@@ -0,0 +1,60 @@
+"""
+Thin JSON client for the AGRIMEN inference server (see INFERENCE_SERVER/server.py).
+
+Set AGRIMEN_INFERENCE_URL (for example ``http://localhost:8500``) to make the
+Streamlit apps send predictions to the server instead of loading models locally.
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+
+INFERENCE_URL = os.environ.get("AGRIMEN_INFERENCE_URL", "").rstrip("/")
+TIMEOUT_SECONDS = float(os.environ.get("AGRIMEN_INFERENCE_TIMEOUT", "30"))
+
+
+class InferenceError(RuntimeError):
+    """Raised when the inference server rejects a request or cannot be reached."""
+
+
+def remote_enabled():
+    """True when the apps should call the inference server instead of local models."""
+    return bool(INFERENCE_URL)
+
+
+def _post(path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(
+        f"{INFERENCE_URL}{path}",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        try:
+            detail = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except ValueError:
+            detail = e.reason
+        raise InferenceError(f"{path}: {detail}") from e
+    except urllib.error.URLError as e:
+        raise InferenceError(f"Inference server unreachable at {INFERENCE_URL}: {e.reason}") from e
+
+
+def predict_one(endpoint, row):
+    """Score a single input dict on ``/v1/<endpoint>`` and return the prediction."""
+    return _post(f"/v1/{endpoint}", row)["prediction"]
+
+
+def predict_batch(endpoint, rows, **options):
+    """
+    Score many rows on ``/v1/<endpoint>/batch``.
+
+    ``rows`` may be a list of dicts or a DataFrame; predictions come back in input
+    order. Extra keyword options (e.g. ``top_k=3`` for recommend) go in the body.
+    """
+    if hasattr(rows, "to_dict"):
+        rows = rows.to_dict(orient="records")
+    return _post(f"/v1/{endpoint}/batch", {"rows": rows, **options})["predictions"]
@@ -0,0 +1,67 @@
+"""
+Training manifest: the metadata an app needs to build its inputs.
+
+Each trainer writes ``models/manifest.json`` next to its artifacts with the
+model's feature order, the vocabulary of every categorical input, the
+observed range of every numeric input and a version that increases with each
+training run. Apps read it once per version (it is a few kB of JSON) instead of
+unpickling encoders or re-deriving option lists, and their widgets always
+offer exactly what the model was trained on.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+
+MANIFEST_NAME = "manifest.json"
+
+
+def numeric_ranges(frame):
+    """{column: {"min", "max", "median"}} for the columns of ``frame``."""
+    stats = frame.agg(["min", "max", "median"])
+    return {col: {k: float(v) for k, v in stats[col].items()} for col in frame.columns}
+
+
+def write_manifest(models_dir, features, vocabularies=None, numeric=None, **extra):
+    """
+    Writes ``<models_dir>/manifest.json`` and returns it as a dict.
+
+    ``vocabularies`` maps categorical column -> categories in the model's
+    order; ``numeric`` is a frame of the raw numeric inputs (its ranges are
+    stored). ``extra`` keys (e.g. ``target``) are stored as given. The version
+    is one more than the manifest being replaced.
+    """
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    previous = 0
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f).get("version", 0)
+    manifest = {
+        "version": previous + 1,
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "features": list(features),
+        "vocabularies": {col: [str(v) for v in values] for col, values in (vocabularies or {}).items()},
+        "numeric_ranges": numeric_ranges(numeric) if numeric is not None else {},
+        **extra,
+    }
+    os.makedirs(models_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    return manifest
+
+
+@lru_cache(maxsize=16)
+def _parse_manifest(path, mtime_ns, size):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(models_dir):
+    """
+    The manifest in ``models_dir`` (FileNotFoundError when absent). It is
+    parsed again only when the file's mtime or size changes, so a retrained
+    model's manifest is picked up without a restart.
+    """
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    st = os.stat(path)
+    return _parse_manifest(path, st.st_mtime_ns, st.st_size)
@@ -0,0 +1,101 @@
+"""
+Fused, versioned model artifacts.
+
+A trainer saves one sklearn Pipeline per model, covering feature engineering,
+encoding, scaling and the estimator, as a single compressed joblib file
+(``<name>.joblib``). A small JSON header (``<name>.json``) sits next to it
+with the payload's SHA-256, its size, a version that increases with every
+save and any metadata the trainer adds (e.g. the input columns).
+
+``load_pipeline`` reads the header first and refuses a payload whose size or
+hash does not match, so a truncated or swapped file fails loudly instead of
+scoring with the wrong model. Loaded pipelines are kept per process.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+PAYLOAD_EXTENSION = ".joblib"
+HEADER_EXTENSION = ".json"
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+class ArtifactIntegrityError(OSError):
+    """The payload on disk does not match its header."""
+
+
+def header_path(path):
+    return os.path.splitext(path)[0] + HEADER_EXTENSION
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_header(path):
+    with open(header_path(path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_pipeline(pipeline, path, compress=3, **metadata):
+    """
+    Writes ``pipeline`` to ``path`` (a ``.joblib`` file) and its header.
+
+    Returns the header dict. ``metadata`` keys (e.g. ``inputs``) are stored
+    in the header as given.
+    """
+    import joblib
+
+    try:
+        version = read_header(path).get("version", 0) + 1
+    except (OSError, ValueError):
+        version = 1
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    joblib.dump(pipeline, path, compress=compress)
+    header = {
+        "version": version,
+        "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sha256": file_sha256(path),
+        "size": os.path.getsize(path),
+        **metadata,
+    }
+    with open(header_path(path), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=1)
+    _loaded.pop(os.path.abspath(path), None)
+    return header
+
+
+def load_pipeline(path):
+    """
+    Returns (pipeline, header), loading and verifying ``path`` on first use.
+
+    Raises FileNotFoundError when the artifact is missing and
+    ArtifactIntegrityError when it does not match its header.
+    """
+    import joblib
+
+    key = os.path.abspath(path)
+    with _lock:
+        if key not in _loaded:
+            header = read_header(path)
+            if os.path.getsize(path) != header["size"] or file_sha256(path) != header["sha256"]:
+                raise ArtifactIntegrityError(f"{path} does not match its header (expected sha256 {header['sha256']})")
+            _loaded[key] = (joblib.load(path), header)
+        return _loaded[key]
+
+
+def forget(path=None):
+    """Drops loaded pipelines (all, or the one at ``path``) so the next load rereads the file."""
+    with _lock:
+        if path is None:
+            _loaded.clear()
+        else:
+            _loaded.pop(os.path.abspath(path), None)
@@ -0,0 +1,103 @@
+"""
+sklearn Pipeline steps for the fused model artifacts.
+
+Kept apart from the lightweight encoders so that importing those does not pull
+in sklearn; these classes are only imported by trainers and, implicitly, when
+a pipeline artifact is unpickled.
+"""
+from sklearn.base import BaseEstimator, RegressorMixin, TransformerMixin
+
+from shared.category_encoder import CategoryEncoder
+
+
+class CategoryCodes(TransformerMixin, BaseEstimator):
+    """
+    Selects ``columns`` from a raw frame and replaces the ``vocabularies``
+    columns with their codes (UNKNOWN for unseen values).
+    """
+
+    def __init__(self, vocabularies, columns):
+        self.vocabularies = vocabularies
+        self.columns = columns
+
+    @property
+    def encoder(self):
+        if getattr(self, "_encoder", None) is None:
+            self._encoder = CategoryEncoder(self.vocabularies)
+        return self._encoder
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def encode(self, df):
+        """Returns (data, errors): the model columns with codes, and per-row error messages."""
+        codes, errors = self.encoder.encode(df)
+        data = df[list(self.columns)].copy()
+        data[self.encoder.columns] = codes
+        return data, errors
+
+    def transform(self, X):
+        return self.encode(X)[0]
+
+
+class SparseFeatures(TransformerMixin, BaseEstimator):
+    """
+    One-hot price frame -> scaled numeric columns plus the sparse one-hot block,
+    in ``feature_columns`` order (``shared.sparse_features.build_matrix``).
+    """
+
+    def __init__(self, scaler, feature_columns):
+        self.scaler = scaler
+        self.feature_columns = feature_columns
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def transform(self, X):
+        from shared.sparse_features import build_matrix
+
+        return build_matrix(X, self.scaler, self.feature_columns)
+
+
+class InteractionFeature(TransformerMixin, BaseEstimator):
+    """Returns the ``columns`` of a raw frame plus ``name`` = ``left`` * ``right``."""
+
+    def __init__(self, left, right, name, columns):
+        self.left = left
+        self.right = right
+        self.name = name
+        self.columns = columns
+
+    def fit(self, X, y=None):
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def transform(self, X):
+        data = X[list(self.columns)].copy()
+        data[self.name] = data[self.left] * data[self.right]
+        return data
+
+
+class BoosterRegressor(RegressorMixin, BaseEstimator):
+    """Final step wrapping an already trained booster (a ``NativeRegressor``)."""
+
+    def __init__(self, native):
+        self.native = native
+
+    def fit(self, X, y=None):
+        """No-op: the booster is trained before it is wrapped, so fitting the pipeline keeps it as is."""
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def predict(self, X):
+        return self.native.predict(X)
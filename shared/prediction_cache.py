@@ -0,0 +1,102 @@
+"""
+Bounded, thread-safe LRU cache for single-input predictions.
+
+Manual-input widgets have small numeric and categorical domains, so many users
+submit the same inputs. Keep one cache per model for the whole process (e.g.
+behind ``st.cache_resource``) so every session shares it. The cache watches its
+model files and empties itself when any of them changes on disk.
+"""
+import os
+import threading
+from collections import OrderedDict
+from numbers import Integral, Real
+
+
+def normalize_key(values, decimals=2):
+    """Canonical hashable key: ints stay ints, floats are rounded, strings are stripped."""
+    key = []
+    for v in values:
+        if isinstance(v, str):
+            key.append(v.strip())
+        elif isinstance(v, Integral):
+            key.append(int(v))
+        elif isinstance(v, Real):
+            v = round(float(v), decimals)
+            key.append(int(v) if v.is_integer() else v)
+        else:
+            key.append(v)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    LRU map from normalized input tuples to prediction results.
+
+    ``watch_paths`` are model artifact files; if any of their size or mtime
+    changes, the cache is cleared and ``on_invalidate`` (e.g. resetting the
+    artifact loaders) is called before the next lookup.
+    """
+
+    def __init__(self, maxsize=4096, watch_paths=(), on_invalidate=None):
+        self.maxsize = maxsize
+        self.watch_paths = list(watch_paths)
+        self.on_invalidate = on_invalidate
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = self._current_fingerprint()
+
+    def _current_fingerprint(self):
+        prints = []
+        for path in self.watch_paths:
+            try:
+                st = os.stat(path)
+                prints.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                prints.append((path, None, None))
+        return tuple(prints)
+
+    def _check_artifacts(self):
+        fingerprint = self._current_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._data.clear()
+            self.invalidations += 1
+            if self.on_invalidate is not None:
+                self.on_invalidate()
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached result for ``key``, calling ``compute()`` on a miss."""
+        with self._lock:
+            self._check_artifacts()
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,106 @@
+"""
+Download formats for bulk prediction results.
+
+Results stay numeric; the unit of each prediction column travels as Arrow
+field metadata (``unit``) in Parquet and Arrow IPC files, and in the header
+of CSV exports. Every format is written in row chunks so a large result is
+never rendered to one big string first. Without pyarrow only gzip CSV is
+offered.
+"""
+import gzip
+import io
+
+FORMATS = {
+    "parquet": {"label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "arrow": {"label": "Arrow IPC (Feather)", "extension": "arrow", "mime": "application/vnd.apache.arrow.file"},
+    "csv.gz": {"label": "CSV (gzip)", "extension": "csv.gz", "mime": "application/gzip"},
+    "csv.zst": {"label": "CSV (zstd)", "extension": "csv.zst", "mime": "application/zstd"},
+}
+CHUNK_ROWS = 100_000
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def available_formats():
+    """Format keys usable in this environment, best first."""
+    pa = _pyarrow()
+    if pa is None:
+        return ["csv.gz"]
+    keys = ["parquet", "arrow", "csv.gz"]
+    if pa.Codec.is_available("zstd"):
+        keys.append("csv.zst")
+    return keys
+
+
+def file_name(stem, fmt):
+    return f"{stem}.{FORMATS[fmt]['extension']}"
+
+
+def _chunks(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _schema(df, units):
+    pa = _pyarrow()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for col, unit in (units or {}).items():
+        i = schema.get_field_index(col)
+        if i >= 0:
+            schema = schema.set(i, schema.field(i).with_metadata({"unit": unit}))
+    return schema
+
+
+def _csv_header(df, units):
+    return df.columns if not units else [f"{c} ({units[c]})" if c in units else c for c in df.columns]
+
+
+def export_results(df, fmt, units=None, chunk_rows=CHUNK_ROWS):
+    """
+    Serializes ``df`` to bytes in format ``fmt`` (a FORMATS key).
+
+    ``units`` maps column name -> unit string for numeric prediction columns.
+    """
+    if fmt == "csv.gz":
+        sink = io.BytesIO()
+        header = _csv_header(df, units)
+        with gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=1, mtime=0) as gz:
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            for i, chunk in enumerate(_chunks(df, chunk_rows)):
+                chunk.to_csv(text, index=False, header=header if i == 0 else False)
+            text.flush()
+            text.detach()
+        return sink.getvalue()
+
+    pa = _pyarrow()
+    if pa is None:
+        raise ValueError(f"Export format {fmt!r} requires pyarrow")
+    schema = _schema(df, units)
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+            for chunk in _chunks(df, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    elif fmt == "arrow":
+        with pa.ipc.new_file(sink, schema) as writer:
+            for chunk in _chunks(df, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    elif fmt == "csv.zst":
+        import pyarrow.csv as pacsv
+        header = list(_csv_header(df, units))
+        csv_schema = pa.schema([pa.field(name, f.type) for name, f in zip(header, schema)])
+        with pa.CompressedOutputStream(sink, "zstd") as stream:
+            with pacsv.CSVWriter(stream, csv_schema) as writer:
+                for chunk in _chunks(df, chunk_rows):
+                    table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                    writer.write_table(table.rename_columns(header).cast(csv_schema))
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    return sink.getvalue().to_pybytes()
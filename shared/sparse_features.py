@@ -0,0 +1,130 @@
+"""
+Sparse feature matrices for the one-hot market price model.
+
+``market.csv`` spreads District/Market/Commodity/Variety/Grade over ~150 0/1
+columns next to a handful of numeric ones. Only the numeric columns are
+scaled; the one-hot block is kept as a CSR matrix and appended unscaled, so a
+row costs five stored entries instead of ~150 dense floats. XGBoost reads CSR
+natively and treats absent entries as missing, which for one-hot columns
+carries the same information as 0.
+
+Numeric entries are always stored explicitly (even when 0) so that a scaled
+value of exactly 0 is not mistaken for missing. Feature order is the numeric
+columns (the scaler's ``feature_names_in_``) followed by the one-hot columns.
+"""
+from contextlib import nullcontext
+
+import numpy as np
+import scipy.sparse as sp
+
+from shared.stage_metrics import timed
+
+CHUNK_ROWS = 50_000
+# The price apps' fused artifact (shared.pipeline_artifact), in each app's models/ folder
+PIPELINE_FILE = "price_pipeline.joblib"
+
+
+def one_hot_block(frame, chunk_rows=CHUNK_ROWS):
+    """CSR float32 matrix of a dense 0/1 frame, converted a chunk at a time."""
+    if frame.shape[1] == 0:
+        return sp.csr_matrix((len(frame), 0), dtype=np.float32)
+    parts = [sp.csr_matrix(frame.iloc[start:start + chunk_rows].to_numpy(dtype=np.uint8), dtype=np.float32)
+             for start in range(0, len(frame), chunk_rows)]
+    return sp.vstack(parts, format="csr") if parts else sp.csr_matrix((0, frame.shape[1]), dtype=np.float32)
+
+
+def with_numeric(numeric, block):
+    """Prepends the dense ``numeric`` (n x k) array to ``block`` with every entry stored."""
+    numeric = np.asarray(numeric, dtype=np.float32)
+    n, k = numeric.shape
+    dense = sp.csr_matrix((numeric.ravel(), np.tile(np.arange(k, dtype=np.int32), n),
+                           np.arange(0, n * k + 1, k, dtype=np.int64)), shape=(n, k))
+    return sp.hstack([dense, block], format="csr", dtype=np.float32)
+
+
+def split_columns(feature_columns, scaler):
+    """Returns (numeric, one_hot) column lists for a scaler fitted on the numeric columns only."""
+    numeric = list(scaler.feature_names_in_)
+    numeric_set = set(numeric)
+    return numeric, [c for c in feature_columns if c not in numeric_set]
+
+
+def require_columns(columns, numeric):
+    """
+    Raises ValueError when one of the ``numeric`` model inputs is not among
+    ``columns``. Only one-hot columns may be absent (they mean 0); a missing
+    numeric input would be scored as 0 and yield a meaningless price.
+    """
+    present = set(columns)
+    missing = [c for c in numeric if c not in present]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+
+def build_matrix(df, scaler, feature_columns, metrics_name=None):
+    """
+    Model input for ``df`` (training column names): scaled numeric columns
+    plus the sparse one-hot block. Absent one-hot columns are treated as 0;
+    absent numeric columns raise ValueError (see ``require_columns``).
+
+    With ``metrics_name`` the scaling and the one-hot block are timed as the
+    "scale" and "encode" stages of that model (shared.stage_metrics).
+    """
+    def stage(name):
+        return timed(metrics_name, name, rows=len(df)) if metrics_name else nullcontext()
+
+    numeric, one_hot = split_columns(feature_columns, scaler)
+    require_columns(df.columns, numeric)
+    with stage("scale"):
+        scaled = scaler.transform(df.reindex(columns=numeric, fill_value=0))
+    with stage("encode"):
+        return with_numeric(scaled, one_hot_block(df.reindex(columns=one_hot, fill_value=0)))
+
+
+def fit_matrix(X, numeric_candidates, scaler):
+    """
+    Fits ``scaler`` on the numeric columns of ``X`` and returns
+    (matrix, feature_columns) with the one-hot remainder kept sparse.
+    """
+    numeric = [c for c in X.columns if c in set(numeric_candidates)]
+    scaler.fit(X[numeric])
+    one_hot = [c for c in X.columns if c not in set(numeric)]
+    matrix = with_numeric(scaler.transform(X[numeric]), one_hot_block(X[one_hot]))
+    return matrix, numeric + one_hot
+
+
+def build_pipeline(model, scaler, feature_columns):
+    """
+    Fuses the trained pieces into one Pipeline: one-hot frame -> scaled
+    numeric columns plus sparse one-hot block -> native XGBoost booster.
+    """
+    from sklearn.pipeline import Pipeline
+    from shared.pipeline_steps import BoosterRegressor, SparseFeatures
+    from shared.xgb_native import NativeRegressor
+
+    return Pipeline([
+        ("features", SparseFeatures(scaler, list(feature_columns))),
+        ("model", BoosterRegressor(NativeRegressor.from_model(model))),
+    ])
+
+
+def split_pipeline(pipeline):
+    """(model, scaler, feature_columns) of a ``build_pipeline`` Pipeline."""
+    features = pipeline.named_steps["features"]
+    return pipeline.named_steps["model"], features.scaler, features.feature_columns
+
+
+def row_template(feature_columns, scaler):
+    """
+    (index, base, mean, scale, n_numeric) for writing single rows into a dense
+    array that scores like ``build_matrix``: numeric slots start at the scaled
+    0, one-hot slots start as NaN (missing).
+    """
+    numeric, one_hot = split_columns(feature_columns, scaler)
+    k = len(numeric)
+    index = {name: i for i, name in enumerate(numeric + one_hot)}
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    base = np.full(len(index), np.nan)
+    base[:k] = -mean / scale
+    return index, base, mean, scale, k
@@ -0,0 +1,178 @@
+"""
+Per-stage timers for the prediction hot paths.
+
+Predict paths wrap each stage (parsing an upload, category encoding,
+``scaler.transform``, ``model.predict``, label formatting, writing the
+result) in ``timed(model, stage)``. For every (model, stage) pair the process
+keeps a call count, a latency histogram and a row count:
+
+    with timed("yield", "encode", rows=len(df)):
+        data, errors = encoder.encode(df)
+
+    with timed("yield", "parse") as t:
+        df = pd.read_csv(file)
+        t.rows = len(df)
+
+A timer costs two ``perf_counter`` calls and a short locked update. The
+numbers are exposed three ways:
+
+- ``render()`` returns Prometheus text exposition; the inference server
+  serves it on ``GET /metrics``,
+- with AGRIMEN_METRICS_FILE set, the same text is written to that file at
+  most every AGRIMEN_METRICS_INTERVAL seconds (default 10), for a node
+  exporter textfile collector next to the Streamlit apps,
+- with AGRIMEN_ADMIN set, ``admin_panel()`` shows a table in an app's sidebar.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds; a final +Inf bucket is implied
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "agrimen_stage"
+
+_stats = {}
+_lock = threading.Lock()
+_last_flush = 0.0
+
+
+class _Stat:
+    __slots__ = ("count", "seconds", "rows", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+
+def record(model, stage, seconds, rows=0):
+    """Adds one call of ``stage`` that took ``seconds`` and covered ``rows`` rows."""
+    with _lock:
+        stat = _stats.get((model, stage))
+        if stat is None:
+            stat = _stats[(model, stage)] = _Stat()
+        stat.count += 1
+        stat.seconds += seconds
+        stat.rows += rows
+        stat.buckets[bisect_left(BUCKETS, seconds)] += 1
+    _maybe_flush()
+
+
+class timed:
+    """Context manager timing one call of ``stage``; set ``.rows`` inside when the count is known late."""
+
+    __slots__ = ("model", "stage", "rows", "_start")
+
+    def __init__(self, model, stage, rows=0):
+        self.model = model
+        self.stage = stage
+        self.rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Failed calls are not recorded, so the histograms describe work that completed
+        if exc_type is None:
+            record(self.model, self.stage, time.perf_counter() - self._start, self.rows)
+        return False
+
+
+def _quantile(buckets, count, q):
+    """Upper bound of the bucket holding quantile ``q`` (inf when it is the overflow bucket)."""
+    target = q * count
+    seen = 0
+    for bound, n in zip(BUCKETS + (float("inf"),), buckets):
+        seen += n
+        if seen >= target:
+            return bound
+    return float("inf")
+
+
+def snapshot():
+    """One dict per (model, stage): count, rows, total/mean seconds and bucketed p50/p95 upper bounds."""
+    with _lock:
+        items = [(key, stat.count, stat.seconds, stat.rows, list(stat.buckets)) for key, stat in _stats.items()]
+    return [{
+        "model": model, "stage": stage, "count": count, "rows": rows, "seconds": seconds,
+        "mean_ms": seconds / count * 1000,
+        "p50_ms": _quantile(buckets, count, 0.5) * 1000,
+        "p95_ms": _quantile(buckets, count, 0.95) * 1000,
+    } for (model, stage), count, seconds, rows, buckets in sorted(items)]
+
+
+def render():
+    """All stages in Prometheus text exposition format."""
+    with _lock:
+        items = sorted((key, stat.count, stat.seconds, stat.rows, list(stat.buckets)) for key, stat in _stats.items())
+    lines = [
+        f"# HELP {PREFIX}_seconds Time spent in each prediction stage.",
+        f"# TYPE {PREFIX}_seconds histogram",
+    ]
+    for (model, stage), count, seconds, _, buckets in items:
+        labels = f'model="{model}",stage="{stage}"'
+        cumulative = 0
+        for bound, n in zip(BUCKETS, buckets):
+            cumulative += n
+            lines.append(f'{PREFIX}_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{PREFIX}_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"{PREFIX}_seconds_sum{{{labels}}} {seconds:.6f}")
+        lines.append(f"{PREFIX}_seconds_count{{{labels}}} {count}")
+    lines += [
+        f"# HELP {PREFIX}_rows_total Rows processed by each prediction stage.",
+        f"# TYPE {PREFIX}_rows_total counter",
+    ]
+    for (model, stage), _, _, rows, _ in items:
+        lines.append(f'{PREFIX}_rows_total{{model="{model}",stage="{stage}"}} {rows}')
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path):
+    """Writes ``render()`` to ``path`` atomically (readers never see a partial file)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def _maybe_flush():
+    global _last_flush
+    path = os.environ.get("AGRIMEN_METRICS_FILE")
+    if not path:
+        return
+    now = time.monotonic()
+    if now - _last_flush < float(os.environ.get("AGRIMEN_METRICS_INTERVAL", "10")):
+        return
+    _last_flush = now
+    try:
+        write_file(path)
+    except OSError:
+        pass
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def admin_panel():
+    """Sidebar table of the stage timings, shown only when AGRIMEN_ADMIN is set."""
+    if not os.environ.get("AGRIMEN_ADMIN"):
+        return
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Stage timings (admin)"):
+        rows = snapshot()
+        if not rows:
+            st.caption("No predictions timed yet in this process.")
+            return
+        table = pd.DataFrame(rows)
+        table["total_s"] = table.pop("seconds")
+        st.dataframe(table.round(2), hide_index=True)
+        st.download_button("Prometheus metrics", render(), file_name="agrimen_metrics.prom", mime="text/plain")
+        if st.button("Reset timings"):
+            reset()
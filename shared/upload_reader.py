@@ -0,0 +1,260 @@
+"""
+Typed reading of bulk uploads.
+
+The apps' uploads are parsed with declared dtypes for the columns a model
+uses, so numeric columns skip type inference. Every other column (IDs, farm
+names, notes) is read as plain text and carried through, so results can be
+joined back to the user's records. CSV is parsed by pandas' Arrow engine when
+pyarrow is installed (multi-threaded), Excel by python-calamine when it is
+installed (a Rust reader, several times faster than openpyxl). Both fall back
+to the default pandas engines.
+
+The header is checked before the body is parsed: a file missing a required
+column raises ``SchemaError`` naming it. A cell that does not fit its
+column's numeric dtype also raises SchemaError, unless ``invalid="coerce"``
+is passed: the cell then becomes NaN so the caller can report that row and
+score the rest.
+
+    df = read_upload(file, file.name, FEATURES, dtypes={"Area": "float64"}, invalid="coerce")
+"""
+import numpy as np
+import pandas as pd
+
+# Bytes of CSV text converted per Arrow batch by ``iter_upload``
+BLOCK_SIZE = 16 << 20
+
+
+class SchemaError(ValueError):
+    """The upload lacks a required column or has a value its column's dtype cannot hold."""
+
+
+def _module(name):
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+def csv_engine():
+    return "pyarrow" if _module("pyarrow") is not None else "c"
+
+
+def excel_engine():
+    return "calamine" if _module("python_calamine") is not None else "openpyxl"
+
+
+def is_excel(name):
+    return name.lower().endswith((".xlsx", ".xls"))
+
+
+def read_header(file, name):
+    """Column names of an upload, read without parsing its rows."""
+    file.seek(0)
+    if is_excel(name):
+        header = pd.read_excel(file, nrows=0, engine=excel_engine())
+    else:
+        header = pd.read_csv(file, nrows=0)
+    file.seek(0)
+    return [str(c) for c in header.columns]
+
+
+def check_columns(header, columns, required=None):
+    """Raises SchemaError when one of ``required`` (default: all of ``columns``) is not in ``header``."""
+    required = columns if required is None else required
+    present = set(header)
+    missing = [c for c in required if c not in present]
+    if missing:
+        raise SchemaError(f"Missing required columns: {', '.join(missing)}")
+
+
+def _upload_dtypes(header, columns, dtypes):
+    """The declared dtype of each model column in ``header``; every other column is read as text."""
+    declared = dtypes or {}
+    wanted = set(columns)
+    result = {}
+    for col in header:
+        if col not in wanted:
+            result[col] = str
+        elif col in declared:
+            result[col] = declared[col]
+    return result
+
+
+def _numeric(dtypes):
+    numeric = []
+    for col, dtype in dtypes.items():
+        try:
+            if np.dtype(dtype).kind in "biuf":
+                numeric.append(col)
+        except TypeError:
+            continue
+    return numeric
+
+
+def _coerce(frame, numeric):
+    """Numeric columns read as text, as float64 with NaN where a cell is not a number."""
+    for col in numeric:
+        if col in frame:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce").astype("float64")
+    return frame
+
+
+def _as_text(dtypes, numeric):
+    return {**dtypes, **dict.fromkeys(numeric, str)}
+
+
+def _read(file, name, dtypes):
+    file.seek(0)
+    if is_excel(name):
+        return pd.read_excel(file, dtype=dtypes, engine=excel_engine())
+    if csv_engine() != "pyarrow":
+        return pd.read_csv(file, dtype=dtypes)
+    import pyarrow.csv as pa_csv
+
+    return _from_arrow(pa_csv.read_csv(file, convert_options=_convert_options(dtypes)), dtypes)
+
+
+def read_upload(file, name, columns, dtypes=None, required=None, invalid="raise"):
+    """
+    Reads a CSV or Excel upload into a DataFrame.
+
+    ``columns`` are the model inputs: ``dtypes`` maps column -> dtype for the
+    ones whose type is known (others are inferred), and ``required`` lists
+    those that must be present (default: all of ``columns``). Other columns
+    are kept as text. With ``invalid="coerce"`` numeric cells that do not
+    parse become NaN instead of raising SchemaError.
+    """
+    header = read_header(file, name)
+    check_columns(header, columns, required)
+    dtypes = _upload_dtypes(header, columns, dtypes)
+    try:
+        try:
+            return _read(file, name, dtypes)
+        except (ValueError, TypeError) as e:
+            if invalid != "coerce":
+                raise SchemaError(f"{name}: {e}") from e
+        # Only a file with a bad cell pays for the second parse, with its numeric columns as text
+        numeric = _numeric(dtypes)
+        try:
+            return _coerce(_read(file, name, _as_text(dtypes, numeric)), numeric)
+        except (ValueError, TypeError) as e:
+            raise SchemaError(f"{name}: {e}") from e
+    finally:
+        file.seek(0)
+
+
+def _arrow_types(dtypes):
+    """Arrow column types for the numeric and text dtypes (others are converted after the batch)."""
+    import pyarrow as pa
+
+    types = {}
+    for col, dtype in dtypes.items():
+        if dtype is str:
+            types[col] = pa.string()
+        elif col in _numeric({col: dtype}):
+            types[col] = pa.from_numpy_dtype(np.dtype(dtype))
+    return types
+
+
+def _convert_options(dtypes):
+    import pyarrow.csv as pa_csv
+
+    return pa_csv.ConvertOptions(column_types=_arrow_types(dtypes), strings_can_be_null=True)
+
+
+def _from_arrow(table, dtypes):
+    # Arrow already produced the numeric and text columns; pandas' own Arrow engine
+    # would cast them again, which costs more than the parse
+    arrow = _arrow_types(dtypes)
+    frame = table.to_pandas()
+    rest = {col: dtype for col, dtype in dtypes.items() if col not in arrow}
+    return frame.astype(rest) if rest else frame
+
+
+def _iter_csv(file, dtypes, chunk_rows):
+    file.seek(0)
+    if csv_engine() != "pyarrow":
+        yield from pd.read_csv(file, dtype=dtypes, chunksize=chunk_rows)
+        return
+
+    # Arrow's streaming reader converts ~BLOCK_SIZE bytes at a time across threads
+    import pyarrow.csv as pa_csv
+
+    reader = pa_csv.open_csv(file, read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+                             convert_options=_convert_options(dtypes))
+    for batch in reader:
+        frame = _from_arrow(batch, dtypes)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows].reset_index(drop=True)
+
+
+def _excel_value(value):
+    # calamine returns every number as a float; whole numbers come back as ints, as in pandas
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def _excel_rows(file):
+    """(header, row iterator, close) for the first sheet, with calamine or openpyxl's read-only mode."""
+    file.seek(0)
+    if excel_engine() == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        wb = CalamineWorkbook.from_filelike(file)
+        rows = (list(map(_excel_value, row)) for row in wb.get_sheet_by_index(0).iter_rows())
+    else:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+    return [str(c) for c in next(rows)], rows, wb.close
+
+
+def _iter_excel(file, dtypes, chunk_rows):
+    # pandas.read_excel has no chunksize, so rows are streamed and batched here
+    header, rows, close = _excel_rows(file)
+    try:
+        width = len(header)
+        batch = []
+        for row in rows:
+            batch.append(list(row[:width]) + [None] * (width - len(row)))
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header).astype(dtypes)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header).astype(dtypes)
+    finally:
+        close()
+
+
+def iter_upload(file, name, columns, dtypes=None, required=None, chunk_rows=50_000, invalid="raise"):
+    """
+    Like ``read_upload`` but yields DataFrames of at most ``chunk_rows`` rows,
+    so peak memory depends on the chunk size rather than the file size. The
+    header is checked before the first chunk is read.
+    """
+    header = read_header(file, name)
+    check_columns(header, columns, required)
+    dtypes = _upload_dtypes(header, columns, dtypes)
+    chunks = _iter_excel if is_excel(name) else _iter_csv
+    done = 0
+    try:
+        for chunk in chunks(file, dtypes, chunk_rows):
+            done += len(chunk)
+            yield chunk
+        return
+    except (ValueError, TypeError) as e:
+        if invalid != "coerce":
+            raise SchemaError(f"{name}: {e}") from e
+
+    # A cell did not fit its dtype: read again with the numeric columns as text and
+    # continue after the rows already yielded
+    numeric = _numeric(dtypes)
+    try:
+        for chunk in chunks(file, _as_text(dtypes, numeric), chunk_rows):
+            if done >= len(chunk):
+                done -= len(chunk)
+                continue
+            yield _coerce(chunk.iloc[done:].reset_index(drop=True), numeric)
+            done = 0
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f"{name}: {e}") from e
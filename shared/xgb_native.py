@@ -0,0 +1,118 @@
+"""
+Native XGBoost model files for serving.
+
+``NativeRegressor`` scores a booster through ``inplace_predict`` on a
+contiguous float32 array with a fixed thread count (or on a CSR matrix as-is),
+avoiding the DMatrix construction ``XGBRegressor.predict`` does per call. The
+fused pipeline artifacts (shared.pipeline_artifact) embed one as their final
+step.
+
+For a model pickled on its own as a sklearn-wrapper XGBRegressor,
+``save_native`` writes its booster in XGBoost's binary JSON format (``.ubj``)
+next to the pickle and ``load_regressor`` prefers that file, which skips
+unpickling the wrapper.
+
+The thread count defaults to AGRIMEN_XGB_THREADS, or all cores.
+
+    python -m shared.xgb_native path/to/model.pkl
+
+converts an existing pickle.
+"""
+import argparse
+import os
+
+import numpy as np
+
+NATIVE_EXTENSION = ".ubj"
+
+
+def default_threads():
+    return int(os.environ.get("AGRIMEN_XGB_THREADS", 0)) or os.cpu_count() or 1
+
+
+def native_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + NATIVE_EXTENSION
+
+
+def save_native(model, pickle_path):
+    """Saves ``model``'s booster next to its pickle; returns the native file path."""
+    path = native_path(pickle_path)
+    model.get_booster().save_model(path)
+    return path
+
+
+class NativeRegressor:
+    """
+    A loaded booster with the ``predict(X)`` interface of the sklearn wrapper.
+
+    It pickles as the booster's native UBJ bytes and reloads them with the
+    serving thread count.
+    """
+
+    def __init__(self, booster):
+        self.booster = booster
+        best = booster.attr("best_iteration")
+        # Match XGBRegressor.predict, which stops at the early-stopping round
+        self.iteration_range = (0, int(best) + 1) if best is not None else (0, 0)
+
+    @classmethod
+    def load(cls, path, nthread=None):
+        import xgboost as xgb
+
+        booster = xgb.Booster(params={"nthread": nthread or default_threads()})
+        booster.load_model(path)
+        return cls(booster)
+
+    @classmethod
+    def from_model(cls, model):
+        """Wraps a trained XGBRegressor's booster."""
+        return cls(model.get_booster())
+
+    def __getstate__(self):
+        return {"raw": bytes(self.booster.save_raw("ubj"))}
+
+    def __setstate__(self, state):
+        import xgboost as xgb
+
+        booster = xgb.Booster(params={"nthread": default_threads()})
+        booster.load_model(bytearray(state["raw"]))
+        self.__init__(booster)
+
+    def predict(self, X):
+        import scipy.sparse as sp
+
+        if sp.issparse(X):
+            X = sp.csr_matrix(X, dtype=np.float32)
+        else:
+            X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(X, iteration_range=self.iteration_range, validate_features=False)
+
+
+def load_regressor(pickle_path, nthread=None):
+    """
+    Loads the native booster saved next to ``pickle_path``.
+
+    Falls back to the pickled wrapper when the native file is missing or
+    older than the pickle (e.g. a model retrained without re-exporting).
+    """
+    path = native_path(pickle_path)
+    if os.path.exists(path) and not (
+            os.path.exists(pickle_path) and os.path.getmtime(pickle_path) > os.path.getmtime(path)):
+        return NativeRegressor.load(path, nthread)
+    import joblib
+
+    return joblib.load(pickle_path)
+
+
+def main():
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Save pickled XGBRegressors in native XGBoost format.")
+    parser.add_argument("pickles", nargs="+")
+    args = parser.parse_args()
+    for pickle_path in args.pickles:
+        print(f"{pickle_path} -> {save_native(joblib.load(pickle_path), pickle_path)}")
+
+
+if __name__ == "__main__":
+    main()
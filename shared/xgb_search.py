@@ -0,0 +1,182 @@
+"""
+Budgeted hyperparameter search for the XGBoost trainers.
+
+Compared with GridSearchCV / RandomizedSearchCV over XGBRegressor:
+
+* one global thread budget: trials run in a small pool and each booster gets
+  ``budget // workers`` threads, so the cores are never oversubscribed;
+* the K fold matrices are quantised once (``xgboost.QuantileDMatrix``) and
+  reused by every trial;
+* every fold trains with early stopping on its validation part, so
+  ``n_estimators`` becomes an upper bound instead of a fixed cost;
+* successive halving: all candidates start with a small round budget and only
+  the best 1/eta survive to the next, larger budget.
+
+Wall-clock time and RSS growth are logged for every trial. RSS is sampled by a
+background thread while the trial runs. Trials in the same rung share the
+process, so a trial's growth includes whatever its neighbours allocated
+meanwhile.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold
+
+# sklearn-wrapper names -> native xgboost.train parameter names
+_PARAM_ALIASES = {"learning_rate": "eta", "random_state": "seed", "n_jobs": "nthread"}
+
+
+def _rss_mb():
+    """Current resident set size in MB (psutil, else /proc on Linux); NaN when neither is available."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return float("nan")
+
+
+class _RssSampler:
+    """
+    Polls the RSS every ``interval`` seconds while the block runs.
+    ``delta_mb`` is the highest sample minus the RSS on entry.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.delta_mb = float("nan")
+        self._stop = threading.Event()
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, _rss_mb())
+
+    def __enter__(self):
+        self._start = self._peak = _rss_mb()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.delta_mb = max(self._peak, _rss_mb()) - self._start
+        return False
+
+
+def _booster_params(params, nthread, base_params):
+    native = {"objective": "reg:squarederror", **base_params}
+    for key, value in params.items():
+        if key != "n_estimators":
+            native[_PARAM_ALIASES.get(key, key)] = value
+    native["nthread"] = nthread
+    return native
+
+
+def build_folds(X, y, n_splits=5, max_bin=256, random_state=42):
+    """Quantises every (train, valid) fold once; the result is shared by all trials."""
+    folds = []
+    for train_idx, valid_idx in KFold(n_splits, shuffle=True, random_state=random_state).split(X):
+        dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx], max_bin=max_bin)
+        dvalid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=dtrain)
+        folds.append((dtrain, dvalid, y[valid_idx]))
+    return folds
+
+
+def _run_trial(params, folds, max_rounds, nthread, early_stopping_rounds, base_params):
+    start = time.perf_counter()
+    rounds = min(max_rounds, params.get("n_estimators", max_rounds))
+    scores, iterations = [], []
+    with _RssSampler() as rss:
+        for dtrain, dvalid, y_valid in folds:
+            booster = xgb.train(
+                _booster_params(params, nthread, base_params), dtrain, num_boost_round=rounds,
+                evals=[(dvalid, "valid")], early_stopping_rounds=early_stopping_rounds, verbose_eval=False,
+            )
+            best = booster.best_iteration
+            scores.append(r2_score(y_valid, booster.predict(dvalid, iteration_range=(0, best + 1))))
+            iterations.append(best + 1)
+    return {
+        "params": params,
+        "rounds": rounds,
+        "score": float(np.mean(scores)),
+        "std": float(np.std(scores)),
+        "best_iteration": int(np.median(iterations)),
+        "seconds": time.perf_counter() - start,
+        "rss_delta_mb": rss.delta_mb,
+    }
+
+
+def _key(params, rounds):
+    return tuple(sorted(params.items())), min(rounds, params.get("n_estimators", rounds))
+
+
+def budgeted_search(X, y, candidates, cpu_budget=None, n_splits=5, eta=3, min_rounds=50,
+                    early_stopping_rounds=20, max_bin=256, base_params=None, verbose=True):
+    """
+    Successive-halving search over ``candidates`` (list of XGBRegressor param dicts).
+    ``X`` may be dense or a scipy sparse matrix.
+
+    Returns (best result dict, all trial results). The best result's
+    ``best_iteration`` is the early-stopped number of trees to refit with.
+    """
+    if sp.issparse(X):
+        # Row slicing works on CSR, and absent one-hots stay "missing" as at predict time
+        X = X.tocsr().astype(np.float32)
+    else:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    base_params = base_params or {}
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+
+    max_rounds = max(c.get("n_estimators", min_rounds) for c in candidates)
+    n_rungs = max(1, math.ceil(math.log(max(len(candidates), 1), eta)) + 1)
+    rung_rounds = [max(min_rounds, int(max_rounds / eta ** (n_rungs - 1 - r))) for r in range(n_rungs)]
+
+    t0 = time.perf_counter()
+    folds = build_folds(X, y, n_splits, max_bin)
+    if verbose:
+        print(f"Quantised {n_splits} folds in {time.perf_counter() - t0:.1f}s; "
+              f"{len(candidates)} candidates, rungs {rung_rounds}, CPU budget {cpu_budget}")
+
+    survivors = list(candidates)
+    history = []
+    scored = {}  # (params, effective rounds) -> result, so equal-budget rungs are not retrained
+    for rung, rounds in enumerate(rung_rounds):
+        pending = [p for p in survivors if _key(p, rounds) not in scored]
+        workers = max(1, min(len(pending), cpu_budget // 2 or 1))
+        nthread = max(1, cpu_budget // workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fresh = list(pool.map(
+                lambda p: _run_trial(p, folds, rounds, nthread, early_stopping_rounds, base_params), pending
+            ))
+        for result in fresh:
+            result["rung"] = rung
+            scored[_key(result["params"], rounds)] = result
+            history.append(result)
+            if verbose:
+                print(f"  rung {rung} rounds<={result['rounds']:>4} R2={result['score']:.4f}±{result['std']:.4f} "
+                      f"trees={result['best_iteration']:>4} {result['seconds']:.1f}s "
+                      f"RSS+{result['rss_delta_mb']:.0f}MB {result['params']}")
+
+        results = [scored[_key(p, rounds)] for p in survivors]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        if rung == len(rung_rounds) - 1:
+            best = results[0]
+            break
+        survivors = [r["params"] for r in results[:max(1, math.ceil(len(results) / eta))]]
+
+    if verbose:
+        print(f"Search finished in {time.perf_counter() - t0:.1f}s, {len(history)} trials; best R2 {best['score']:.4f}")
+    return best, history